@@ -0,0 +1,121 @@
+import threading
+import time
+from datetime import datetime
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def mbit_to_bytes(mbit):
+    """Megabits per second to bytes per second, 0 stays 0 (unlimited)."""
+    return float(mbit or 0) * 1000 * 1000 / 8
+
+
+def _minutes(clock):
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class TokenBucket:
+    """Token bucket in bytes, refilled at a rate that may change between calls.
+
+    A consumer may take more than the bucket holds; it then waits until the
+    debt is paid off, so concurrent consumers together stay at the rate.
+    """
+
+    def __init__(self, burst_seconds=1.0):
+        self.burst_seconds = burst_seconds
+        self.lock = threading.Lock()
+        self.tokens = 0.0
+        self.last = time.monotonic()
+
+    def consume(self, size, rate):
+        """Take size bytes at rate bytes per second, blocking as needed; a rate of 0 is unlimited."""
+        if not rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(rate * self.burst_seconds, self.tokens + (now - self.last) * rate)
+            self.last = now
+            self.tokens -= size
+            wait = -self.tokens / rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BandwidthLimiter:
+    """Aggregate and per-stream byte rate caps for one direction of traffic.
+
+    Every stream (one HTTP response or upload) has its own bucket, and all of
+    them share the aggregate bucket. Schedule entries replace the default caps
+    between their from and to times (local time, wrapping past midnight when
+    to is earlier than from), optionally only on some days of the week.
+    """
+
+    def __init__(self, rate=0, stream_rate=0, schedule=()):
+        self.rate = rate
+        self.stream_rate = stream_rate
+        # (from minute, to minute, weekdays or None, rate, stream rate)
+        self.schedule = list(schedule)
+        self.bucket = TokenBucket()
+        self.cached_limits = None
+        self.cached_until = 0.0
+
+    @classmethod
+    def from_config(cls, config, direction):
+        """Limiter for "download" or "upload" from the Bandwidth config section.
+
+        Rates are in Mbit/s, <direction>_mbps caps all streams together and
+        <direction>_stream_mbps caps each stream; 0 or missing is unlimited.
+        """
+        rate = mbit_to_bytes(config.get(f"{direction}_mbps", 0))
+        stream_rate = mbit_to_bytes(config.get(f"{direction}_stream_mbps", 0))
+        schedule = []
+        for entry in config.get("schedule", []):
+            days = entry.get("days")
+            schedule.append((
+                _minutes(entry["from"]),
+                _minutes(entry["to"]),
+                {WEEKDAYS.index(day.lower()[:3]) for day in days} if days else None,
+                mbit_to_bytes(entry.get(f"{direction}_mbps", 0)),
+                mbit_to_bytes(entry.get(f"{direction}_stream_mbps", 0))
+            ))
+        return cls(rate, stream_rate, schedule)
+
+    def limits(self, now=None):
+        """Return the (aggregate, per-stream) rates in bytes per second that apply now."""
+        if now is None:
+            # looked up for every chunk, so the schedule is only evaluated once a second
+            if time.monotonic() < self.cached_until:
+                return self.cached_limits
+            self.cached_limits = self.limits(datetime.now())
+            self.cached_until = time.monotonic() + 1
+            return self.cached_limits
+
+        minute = now.hour * 60 + now.minute
+        for start, end, days, rate, stream_rate in self.schedule:
+            # a window that wraps past midnight belongs to the day it started on
+            day = now.weekday() if start <= minute else (now.weekday() - 1) % 7
+            if days is not None and day not in days:
+                continue
+            if start <= end and start <= minute < end:
+                return rate, stream_rate
+            if start > end and (minute >= start or minute < end):
+                return rate, stream_rate
+        return self.rate, self.stream_rate
+
+    def stream(self):
+        return BandwidthStream(self)
+
+
+class BandwidthStream:
+    """Per-stream handle of a BandwidthLimiter."""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.bucket = TokenBucket()
+
+    def throttle(self, size):
+        """Wait until size more bytes may be transferred."""
+        rate, stream_rate = self.limiter.limits()
+        self.bucket.consume(size, stream_rate)
+        self.limiter.bucket.consume(size, rate)
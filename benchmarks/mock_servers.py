@@ -0,0 +1,439 @@
+"""Local stand-ins for the Zoom and Google Drive APIs, for benchmarks without a network.
+
+Both servers run on a free port of 127.0.0.1 in background threads and can add a
+fixed latency to every request, cap the bandwidth of each response or upload,
+and answer 429 once requests exceed a rate. Recording files are synthetic: their
+bytes are generated from a repeating pattern, so multi-GB files need no memory
+or disk on the server side.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PATTERN = random.Random(0).randbytes(1024 * 1024)
+BLOCK_SIZE = 64 * 1024
+
+
+def synthetic_bytes(start, end):
+    """Yield the synthetic file content from byte start to byte end inclusive."""
+    offset = start
+    while offset <= end:
+        position = offset % len(PATTERN)
+        size = min(BLOCK_SIZE, len(PATTERN) - position, end - offset + 1)
+        yield memoryview(PATTERN)[position:position + size]
+        offset += size
+
+
+class MockServer:
+    """HTTP server with per-request latency, per-response bandwidth and a request rate limit.
+
+    latency is in seconds, bandwidth in bytes per second for each response or
+    request body (0 is unlimited) and rate_limit in requests per second across
+    the requests that count against it (0 is unlimited).
+    """
+
+    def __init__(self, latency=0.0, bandwidth=0, rate_limit=0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.rate_limit = rate_limit
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.tokens = float(rate_limit)
+        self.refilled_at = time.monotonic()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+
+    def limited(self):
+        """Take a request from the rate limit bucket, True if there was none left."""
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled_at) * self.rate_limit)
+            self.refilled_at = now
+            if self.tokens < 1:
+                self.stats["rate_limited"] += 1
+                return True
+            self.tokens -= 1
+            return False
+
+    def throttle(self, started, transferred):
+        """Sleep until transferred bytes since started fit in the bandwidth."""
+        if self.bandwidth:
+            delay = started + transferred / self.bandwidth - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def route(self, request, method, path, query):
+        raise NotImplementedError
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def read_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                data = bytearray()
+                started = time.monotonic()
+                while len(data) < length:
+                    block = self.rfile.read(min(BLOCK_SIZE, length - len(data)))
+                    if not block:
+                        break
+                    data += block
+                    server.throttle(started, len(data))
+                return bytes(data)
+
+            def reply(self, status, body=b"", headers=None):
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode("utf-8")
+                    headers = {"Content-Type": "application/json", **(headers or {})}
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def stream(self, status, blocks, length, headers):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(length))
+                self.end_headers()
+                sent = 0
+                started = time.monotonic()
+                for block in blocks:
+                    self.wfile.write(block)
+                    sent += len(block)
+                    server.count("bytes_sent", len(block))
+                    server.throttle(started, sent)
+
+            def handle_request(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urllib.parse.urlsplit(self.path)
+                query = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+                try:
+                    server.route(self, self.command, url.path, query)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = handle_request
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MockZoom(MockServer):
+    """Zoom OAuth, users, recordings and download endpoints.
+
+    Every one of users users has meetings meetings starting on recording_date, each
+    with files_per_meeting recording files of file_size bytes. Downloads support
+    Range requests. The rate limit applies to the API calls, not to downloads.
+    """
+
+    def __init__(self, users=2, meetings=3, files_per_meeting=2, file_size=10 * 1024 * 1024,
+                 recording_date="2024-01-02", token_ttl=3600, **kwargs):
+        super().__init__(**kwargs)
+        self.users = users
+        self.meetings = meetings
+        self.files_per_meeting = files_per_meeting
+        self.file_size = file_size
+        self.recording_date = datetime.fromisoformat(recording_date).replace(tzinfo=timezone.utc)
+        self.token_ttl = token_ttl
+        self.tokens_issued = set()
+
+    @property
+    def api_url(self):
+        return f"{self.url}/v2"
+
+    @property
+    def oauth_url(self):
+        return f"{self.url}/oauth/token"
+
+    def recordings(self, user_id, start, end):
+        if not start <= self.recording_date.date() <= end:
+            return []
+        meetings = []
+        for meeting in range(self.meetings):
+            start_time = self.recording_date + timedelta(hours=meeting)
+            meetings.append({
+                "uuid": f"{user_id}-meeting-{meeting}",
+                "id": 1000000 + meeting,
+                "host_id": user_id,
+                "topic": f"Benchmark meeting {meeting}",
+                "start_time": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "recording_files": [
+                    {
+                        "id": f"{user_id}-meeting-{meeting}-file-{number}",
+                        "file_type": "MP4",
+                        "file_extension": "MP4",
+                        "file_size": self.file_size,
+                        "recording_type": f"shared_screen_with_speaker_view_{number}",
+                        "status": "completed",
+                        "download_url": f"{self.url}/rec/download/{user_id}-meeting-{meeting}-file-{number}"
+                    }
+                    for number in range(self.files_per_meeting)
+                ]
+            })
+        return meetings
+
+    def route(self, request, method, path, query):
+        if path == "/oauth/token" and method == "POST":
+            request.read_body()
+            self.count("oauth")
+            token = uuid.uuid4().hex
+            with self.lock:
+                self.tokens_issued.add(token)
+            request.reply(200, {"access_token": token, "token_type": "bearer", "expires_in": self.token_ttl})
+            return
+
+        if path.startswith("/rec/download/"):
+            self.count("download")
+            self.download(request, method)
+            return
+
+        if request.headers.get("Authorization", "").partition(" ")[2] not in self.tokens_issued:
+            self.count("unauthorized")
+            request.reply(401, {"code": 124, "message": "Invalid access token."})
+            return
+
+        if self.limited():
+            request.reply(429, {"code": 429, "message": "Too many requests"}, {"Retry-After": "1"})
+            return
+
+        if path == "/v2/users":
+            self.count("users")
+            page_size = int(query.get("page_size", 30))
+            page_number = int(query.get("page_number", 1))
+            users = [
+                {"id": f"user{number}", "email": f"user{number}@example.com",
+                 "first_name": "Benchmark", "last_name": f"User {number}"}
+                for number in range(self.users)
+            ]
+            request.reply(200, {
+                "page_count": max(1, -(-len(users) // page_size)),
+                "page_number": page_number,
+                "page_size": page_size,
+                "total_records": len(users),
+                "users": users[(page_number - 1) * page_size:page_number * page_size]
+            })
+            return
+
+        match = re.fullmatch(r"/v2/users/([^/]+)/recordings", path)
+        if match:
+            self.count("recordings")
+            user_id = urllib.parse.unquote(match.group(1)).split("@")[0]
+            start = datetime.fromisoformat(query["from"][:10]).date()
+            end = datetime.fromisoformat(query["to"][:10]).date()
+            meetings = self.recordings(user_id, start, end)
+            page_size = int(query.get("page_size", 30))
+            offset = int(query.get("next_page_token") or 0)
+            more = offset + page_size < len(meetings)
+            request.reply(200, {
+                "from": query["from"],
+                "to": query["to"],
+                "page_size": page_size,
+                "total_records": len(meetings),
+                "next_page_token": str(offset + page_size) if more else "",
+                "meetings": meetings[offset:offset + page_size]
+            })
+            return
+
+        request.reply(404, {"code": 404, "message": "not found"})
+
+    def download(self, request, method):
+        start, end, status = 0, self.file_size - 1, 200
+        headers = {"Accept-Ranges": "bytes", "Content-Type": "video/mp4"}
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", request.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            if start >= self.file_size:
+                request.reply(416, b"", {"Content-Range": f"bytes */{self.file_size}"})
+                return
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{self.file_size}"
+        if method == "HEAD":
+            request.reply(status, b"", headers)
+            return
+        request.stream(status, synthetic_bytes(start, end), end - start + 1, headers)
+
+
+class MockDrive(MockServer):
+    """Google Drive files and resumable upload endpoints, for a client built with api_root_url.
+
+    Uploaded bytes are only counted and hashed, not kept. The rate limit applies
+    to upload requests only, as the client does not retry folder lookups.
+    """
+
+    FOLDER = "application/vnd.google-apps.folder"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.files = {}  # id -> metadata
+        self.sessions = {}  # upload id -> {"metadata", "size", "received", "md5"}
+
+    def _create(self, metadata, **extra):
+        file_id = uuid.uuid4().hex
+        item = {
+            "id": file_id,
+            "name": metadata.get("name", "untitled"),
+            "mimeType": metadata.get("mimeType", "application/octet-stream"),
+            "parents": metadata.get("parents", []),
+            **extra
+        }
+        with self.lock:
+            self.files[file_id] = item
+        return item
+
+    def _matches(self, item, query):
+        """Evaluate the subset of the Drive query language the client uses."""
+        for clause in re.split(r"\s+and\s+", query.strip()):
+            match = re.fullmatch(r"name\s*=\s*'((?:[^'\\]|\\.)*)'", clause)
+            if match and item["name"] != re.sub(r"\\(.)", r"\1", match.group(1)):
+                return False
+            match = re.fullmatch(r"mimeType\s*(!?=)\s*'([^']*)'", clause)
+            if match and (item["mimeType"] == match.group(2)) != (match.group(1) == "="):
+                return False
+            match = re.fullmatch(r"'([^']*)'\s+in\s+parents", clause)
+            if match and match.group(1) not in item["parents"]:
+                return False
+        return True
+
+    def route(self, request, method, path, query):
+        if path.endswith("/upload/drive/v3/files"):
+            self.upload(request, method, query)
+            return
+
+        if path == "/drive/v3/about":
+            self.count("about")
+            request.reply(200, {"user": {"emailAddress": "benchmark@example.com", "displayName": "Benchmark"}})
+            return
+
+        if path == "/drive/v3/files" and method == "GET":
+            self.count("list")
+            with self.lock:
+                # like Drive, listing the children of a folder that does not exist is a 404
+                parents = re.findall(r"'([^']*)'\s+in\s+parents", query.get("q", ""))
+                if any(parent not in self.files for parent in parents):
+                    request.reply(404, {"error": {"code": 404, "message": "File not found"}})
+                    return
+                items = [item for item in self.files.values() if self._matches(item, query.get("q", ""))]
+            page_size = int(query.get("pageSize", 100))
+            offset = int(query.get("pageToken") or 0)
+            response = {"files": items[offset:offset + page_size]}
+            if offset + page_size < len(items):
+                response["nextPageToken"] = str(offset + page_size)
+            request.reply(200, response)
+            return
+
+        if path == "/drive/v3/files" and method == "POST":
+            self.count("create")
+            metadata = json.loads(request.read_body() or b"{}")
+            if any(parent not in self.files for parent in metadata.get("parents", [])):
+                request.reply(404, {"error": {"code": 404, "message": "File not found"}})
+                return
+            request.reply(200, self._create(metadata))
+            return
+
+        match = re.fullmatch(r"/drive/v3/files/([^/]+)", path)
+        if match and method == "GET":
+            self.count("get")
+            item = self.files.get(match.group(1))
+            if item is None:
+                request.reply(404, {"error": {"code": 404, "message": "File not found"}})
+            else:
+                request.reply(200, {**item, "trashed": False})
+            return
+        if match and method == "DELETE":
+            self.count("delete")
+            with self.lock:
+                self.files.pop(match.group(1), None)
+            request.reply(204)
+            return
+
+        request.reply(404, {"error": {"code": 404, "message": "not found"}})
+
+    def upload(self, request, method, query):
+        if self.limited():
+            request.read_body()
+            request.reply(429, {"error": {"code": 429, "message": "Rate Limit Exceeded"}}, {"Retry-After": "1"})
+            return
+
+        if method == "POST":
+            self.count("upload_sessions")
+            metadata = json.loads(request.read_body() or b"{}")
+            upload_id = uuid.uuid4().hex
+            size = request.headers.get("X-Upload-Content-Length")
+            with self.lock:
+                self.sessions[upload_id] = {
+                    "metadata": metadata, "size": int(size) if size else None, "received": 0, "md5": hashlib.md5()
+                }
+            location = f"{self.url}/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+            request.reply(200, b"", {"Location": location})
+            return
+
+        session = self.sessions.get(query.get("upload_id"))
+        body = request.read_body()
+        if session is None:
+            request.reply(404, {"error": {"code": 404, "message": "upload session not found"}})
+            return
+        self.count("upload_chunks")
+        self.count("bytes_received", len(body))
+
+        match = re.fullmatch(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)", request.headers.get("Content-Range", ""))
+        if not match:
+            request.reply(400, {"error": {"code": 400, "message": "bad Content-Range"}})
+            return
+        with self.lock:
+            if match.group(3) != "*":
+                session["size"] = int(match.group(3))
+            if match.group(1) is not None:
+                start = int(match.group(1))
+                if start > session["received"]:
+                    request.reply(400, {"error": {"code": 400, "message": "gap in uploaded data"}})
+                    return
+                # bytes Drive already holds are sent again after a lost response
+                new = body[session["received"] - start:]
+                session["md5"].update(new)
+                session["received"] += len(new)
+            received, size = session["received"], session["size"]
+
+        if size is not None and received >= size:
+            item = self._create(
+                session["metadata"], size=str(received), md5Checksum=session["md5"].hexdigest()
+            )
+            request.reply(200, item)
+            return
+        request.reply(308, b"", {"Range": f"bytes=0-{received - 1}"} if received else {})
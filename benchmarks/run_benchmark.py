@@ -0,0 +1,310 @@
+"""End to end benchmark of zoom-recording-downloader against local stand-in servers.
+
+Starts the mock Zoom (and optionally Google Drive or S3) servers, writes a configuration
+for them into a scratch directory and runs the downloader there in log mode,
+without prompts. Each run reports files/s, MB/s, Zoom API calls per recording and
+the peak RSS of the downloader process; pass --output to save the results and
+--baseline to compare against an earlier run and fail on regressions.
+
+    python benchmarks/run_benchmark.py --users 4 --meetings 5 --file-size-mb 50
+    python benchmarks/run_benchmark.py --drive --file-size-mb 2048 --output after.json --baseline before.json
+    python benchmarks/run_benchmark.py --s3 --file-size-mb 500 --set S3.part_size_mb=16
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_servers import MockDrive, MockZoom
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "zoom-recording-downloader.py")
+
+# metric -> True when higher is better
+RESULTS = {
+    "files_per_second": True,
+    "download_mb_per_second": True,
+    "upload_mb_per_second": True,
+    "api_calls_per_recording": False,
+    "peak_rss_mb": False,
+}
+
+
+def mbit(value):
+    """Mbit/s to bytes per second."""
+    return float(value) * 1000 * 1000 / 8
+
+
+class S3Endpoint:
+    """The S3 store of a run: a moto server, or with --s3-endpoint an existing one such as a local MinIO."""
+
+    def __init__(self, args):
+        self.args = args
+        self.url = args.s3_endpoint
+        self.server = None
+
+    def start(self):
+        import boto3
+        if not self.url:
+            # pip install "moto[server]"
+            from moto.server import ThreadedMotoServer
+            self.server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+            self.server.start()
+            host, port = self.server.get_host_and_port()
+            self.url = f"http://{host}:{port}"
+
+        client = boto3.client(
+            "s3", endpoint_url=self.url, region_name="us-east-1",
+            aws_access_key_id=self.args.s3_access_key, aws_secret_access_key=self.args.s3_secret_key
+        )
+        try:
+            client.create_bucket(Bucket=self.args.s3_bucket)
+        except (client.exceptions.BucketAlreadyOwnedByYou, client.exceptions.BucketAlreadyExists):
+            pass
+        return self
+
+    def shutdown(self):
+        if self.server:
+            self.server.stop()
+
+
+def build_config(args, zoom, drive, s3, directory):
+    config = {
+        "OAuth": {"account_id": "benchmark", "client_id": "benchmark", "client_secret": "benchmark"},
+        "Network": {"api_url": zoom.api_url, "oauth_url": zoom.oauth_url},
+        "Storage": {
+            "download_dir": "downloads",
+            "method": "google_drive" if drive else "s3" if s3 else "local",
+            "retry_delay": 1
+        },
+        "Recordings": {"start_date": "2024-01-01", "end_date": "2024-01-31"},
+        "Metrics": {"report_file": "run-report.json"},
+        "Logging": {"log_mode": True}
+    }
+    if drive:
+        config["GoogleDrive"] = {
+            "api_root_url": drive.url,
+            "client_secrets_file": "client_secrets.json",
+            "token_file": "token.json",
+            "stream_uploads": args.stream_uploads,
+            "retry_delay": 1
+        }
+    if s3:
+        config["S3"] = {
+            "endpoint_url": s3.url,
+            "region": "us-east-1",
+            "bucket": args.s3_bucket,
+            # a fresh prefix per run, so that no file is found from an earlier run
+            "prefix": os.path.basename(directory),
+            "access_key_id": args.s3_access_key,
+            "secret_access_key": args.s3_secret_key,
+            "addressing_style": "path",
+            "stream_uploads": args.stream_uploads
+        }
+
+    for setting in args.set:
+        key, _, value = setting.partition("=")
+        section, _, name = key.partition(".")
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass  # a plain string
+        config.setdefault(section, {})[name] = value
+    return config
+
+
+def write_drive_credentials(directory, drive):
+    """Credentials the Drive client accepts without a browser login or refresh."""
+    with open(os.path.join(directory, "client_secrets.json"), "w") as fd:
+        json.dump({"installed": {"client_id": "benchmark", "client_secret": "benchmark"}}, fd)
+    with open(os.path.join(directory, "token.json"), "w") as fd:
+        json.dump({
+            "token": "benchmark",
+            "refresh_token": "benchmark",
+            "client_id": "benchmark",
+            "client_secret": "benchmark",
+            "token_uri": f"{drive.url}/token",
+            "expiry": "2999-01-01T00:00:00Z"
+        }, fd)
+
+
+def run_once(args, directory):
+    zoom = MockZoom(
+        users=args.users,
+        meetings=args.meetings,
+        files_per_meeting=args.files,
+        file_size=int(args.file_size_mb * 1024 * 1024),
+        latency=args.latency_ms / 1000,
+        bandwidth=mbit(args.bandwidth_mbps),
+        rate_limit=args.rate_limit
+    ).start()
+    drive = None
+    if args.drive:
+        drive = MockDrive(
+            latency=args.drive_latency_ms / 1000,
+            bandwidth=mbit(args.drive_bandwidth_mbps),
+            rate_limit=args.drive_rate_limit
+        ).start()
+        write_drive_credentials(directory, drive)
+
+    s3 = None
+    try:
+        if args.s3:
+            s3 = S3Endpoint(args).start()
+
+        with open(os.path.join(directory, "zoom-recording-downloader.conf"), "w") as fd:
+            json.dump(build_config(args, zoom, drive, s3, directory), fd, indent=4)
+
+        with open(os.path.join(directory, "output.log"), "w") as log:
+            started = time.monotonic()
+            process = subprocess.Popen(
+                [sys.executable, SCRIPT, "--log-mode"], cwd=directory,
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT
+            )
+            # wait4 gives the resource usage of this process alone
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            duration = time.monotonic() - started
+    finally:
+        zoom.shutdown()
+        if drive:
+            drive.shutdown()
+        if s3:
+            s3.shutdown()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"the downloader exited with {process.returncode}, see {directory}/output.log")
+
+    with open(os.path.join(directory, "run-report.json")) as fd:
+        report = json.load(fd)
+
+    def counter(name, **labels):
+        return sum(
+            item["value"] for item in report["counters"]
+            if item["name"] == name and labels.items() <= item["labels"].items()
+        )
+
+    api_calls = sum(
+        item["value"] for item in report["counters"]
+        if item["name"] == "zoom_requests_total" and item["labels"]["category"] != "download"
+    )
+    recordings = counter("recordings_listed_total")
+    files = counter("files_total", result="ok")
+    return {
+        "duration_seconds": round(duration, 3),
+        "files": files,
+        "failed_files": counter("files_total", result="failed"),
+        "recordings": recordings,
+        "api_calls": api_calls,
+        "rate_limited": zoom.stats["rate_limited"] + (drive.stats["rate_limited"] if drive else 0),
+        "downloaded_mb": round(counter("download_bytes_total") / 1e6, 3),
+        "uploaded_mb": round(counter("upload_bytes_total") / 1e6, 3),
+        "files_per_second": round(files / duration, 3),
+        "download_mb_per_second": round(counter("download_bytes_total") / 1e6 / duration, 3),
+        "upload_mb_per_second": round(counter("upload_bytes_total") / 1e6 / duration, 3),
+        "api_calls_per_recording": round(api_calls / recordings, 3) if recordings else None,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def summarize(runs):
+    """Median of every numeric result over the runs."""
+    summary = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs if run[key] is not None]
+        summary[key] = statistics.median(values) if values else None
+    return summary
+
+
+def regressions(summary, baseline, tolerance):
+    found = []
+    for key, higher_is_better in RESULTS.items():
+        before, after = baseline.get(key), summary.get(key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            found.append(f"{key}: {before} -> {after} ({change:+.0%})")
+    return found
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    workload = parser.add_argument_group("workload")
+    workload.add_argument("--users", type=int, default=4)
+    workload.add_argument("--meetings", type=int, default=5, help="meetings per user")
+    workload.add_argument("--files", type=int, default=2, help="recording files per meeting")
+    workload.add_argument("--file-size-mb", type=float, default=20, help="size of every recording file, in MiB")
+
+    zoom = parser.add_argument_group("mock Zoom server")
+    zoom.add_argument("--latency-ms", type=float, default=0, help="added to every request")
+    zoom.add_argument("--bandwidth-mbps", type=float, default=0, help="cap of each download response, 0 is unlimited")
+    zoom.add_argument("--rate-limit", type=float, default=0, help="API requests per second before 429, 0 is unlimited")
+
+    drive = parser.add_argument_group("mock Google Drive server")
+    drive.add_argument("--drive", action="store_true", help="upload to the mock Google Drive")
+    drive.add_argument("--stream-uploads", action="store_true", help="stream from Zoom to Drive or S3 without staging")
+    drive.add_argument("--drive-latency-ms", type=float, default=0)
+    drive.add_argument("--drive-bandwidth-mbps", type=float, default=0, help="cap of each upload request")
+    drive.add_argument("--drive-rate-limit", type=float, default=0, help="upload requests per second before 429")
+
+    s3 = parser.add_argument_group("S3")
+    s3.add_argument("--s3", action="store_true", help="upload to S3, a local moto server unless --s3-endpoint is given")
+    s3.add_argument("--s3-endpoint", help="an S3 compatible store to use instead, e.g. http://localhost:9000 for MinIO")
+    s3.add_argument("--s3-bucket", default="zoom-recording-benchmark")
+    s3.add_argument("--s3-access-key", default="benchmark")
+    s3.add_argument("--s3-secret-key", default="benchmark")
+
+    run = parser.add_argument_group("run")
+    run.add_argument("--set", action="append", default=[], metavar="SECTION.KEY=VALUE",
+                     help="extra configuration, VALUE is JSON or a plain string")
+    run.add_argument("--repeat", type=int, default=1, help="runs to take the median of")
+    run.add_argument("--work-dir", help="where the scratch directories are created")
+    run.add_argument("--keep", action="store_true", help="keep the scratch directories")
+    run.add_argument("--output", help="write the results to this JSON file")
+    run.add_argument("--baseline", help="results of an earlier --output to compare with")
+    run.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression (default 0.1)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    runs = []
+    for number in range(args.repeat):
+        directory = tempfile.mkdtemp(prefix="zrd-benchmark-", dir=args.work_dir)
+        try:
+            result = run_once(args, directory)
+        finally:
+            if not args.keep:
+                shutil.rmtree(directory, ignore_errors=True)
+        runs.append(result)
+        print(f"run {number + 1}/{args.repeat}: " + ", ".join(f"{key} {value}" for key, value in result.items()))
+
+    summary = summarize(runs)
+    print("\nmedian of", len(runs), "runs:")
+    for key, value in summary.items():
+        print(f"  {key:<26}{value}")
+
+    if args.output:
+        with open(args.output, "w") as fd:
+            json.dump({"arguments": vars(args), "summary": summary, "runs": runs}, fd, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fd:
+            baseline = json.load(fd)["summary"]
+        found = regressions(summary, baseline, args.tolerance)
+        if found:
+            print("\nregressions against", args.baseline)
+            for line in found:
+                print("  " + line)
+            sys.exit(1)
+        print("\nno regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import re
+
+MIB = 1024 * 1024
+
+# rule keys that match a file, every one given must match
+MATCHERS = ("file_type", "recording_type", "file_extension", "min_size_mb", "max_size_mb", "topic", "user")
+ACTIONS = ("include", "exclude")
+
+
+def _names(value):
+    """A name or list of names from the config, lower-cased for matching."""
+    values = [value] if isinstance(value, str) else list(value)
+    return {str(name).lower() for name in values}
+
+
+class Rule:
+    """One entry of the Selection rules: which files it matches, and whether they are kept.
+
+    An include rule with prefer only keeps, of the files of a recording it matches,
+    the ones with the first recording_type in prefer that the recording has.
+    """
+
+    def __init__(self, config):
+        unknown = set(config) - set(MATCHERS) - {"action", "prefer"}
+        if unknown:
+            raise ValueError(f"unknown rule keys {', '.join(sorted(unknown))}")
+        self.action = config.get("action", "include")
+        if self.action not in ACTIONS:
+            raise ValueError(f"unknown rule action '{self.action}', use 'include' or 'exclude'")
+
+        self.file_types = _names(config["file_type"]) if "file_type" in config else None
+        self.recording_types = _names(config["recording_type"]) if "recording_type" in config else None
+        self.file_extensions = _names(config["file_extension"]) if "file_extension" in config else None
+        self.users = _names(config["user"]) if "user" in config else None
+        self.min_size = float(config["min_size_mb"]) * MIB if "min_size_mb" in config else None
+        self.max_size = float(config["max_size_mb"]) * MIB if "max_size_mb" in config else None
+        try:
+            self.topic = re.compile(config["topic"]) if "topic" in config else None
+        except re.error as e:
+            raise ValueError(f"invalid topic pattern '{config['topic']}': {e}")
+
+        self.prefer = [name.lower() for name in config.get("prefer", [])]
+        if self.prefer and self.action != "include":
+            raise ValueError("prefer only applies to include rules")
+
+    def matches(self, recording, users, download):
+        file_type, file_extension, _, recording_type, _, file_size = download
+        return (
+            (self.file_types is None or file_type.lower() in self.file_types)
+            and (self.recording_types is None or recording_type.lower() in self.recording_types)
+            and (self.file_extensions is None or file_extension.lower() in self.file_extensions)
+            and (self.min_size is None or file_size >= self.min_size)
+            and (self.max_size is None or file_size <= self.max_size)
+            and (self.topic is None or self.topic.search(recording.get("topic") or "") is not None)
+            and (self.users is None or not self.users.isdisjoint(users))
+        )
+
+
+class SelectionRules:
+    """Chooses which files of a recording are downloaded, before any of them is scheduled.
+
+    Each file takes the action of the first rule that matches it, or default when
+    none does. Files are the tuples get_downloads() returns.
+    """
+
+    def __init__(self, rules=(), default="include"):
+        if default not in ACTIONS:
+            raise ValueError(f"unknown default action '{default}', use 'include' or 'exclude'")
+        self.rules = [Rule(rule) for rule in rules]
+        self.default = default
+
+    @classmethod
+    def from_config(cls, config):
+        """Rules from the Selection config section, ValueError if they are not valid."""
+        return cls(config.get("rules", []), config.get("default", "include"))
+
+    def select(self, recording, downloads, users=()):
+        """Split the files of a recording into the ones to download and the ones to skip.
+
+        users are the email and ID of the recording's user, for the rules that match users.
+        """
+        users = {str(user).lower() for user in users if user}
+        keep = [False] * len(downloads)
+        preferred = {}  # rule -> indexes of the files it matched, choosing between them
+
+        for index, download in enumerate(downloads):
+            rule = next((rule for rule in self.rules if rule.matches(recording, users, download)), None)
+            if rule is not None and rule.prefer:
+                preferred.setdefault(rule, []).append(index)
+            else:
+                keep[index] = (rule.action if rule else self.default) == "include"
+
+        for rule, indexes in preferred.items():
+            present = {downloads[index][3].lower() for index in indexes}
+            best = next((recording_type for recording_type in rule.prefer if recording_type in present), None)
+            for index in indexes:
+                keep[index] = downloads[index][3].lower() == best
+
+        kept = [download for download, wanted in zip(downloads, keep) if wanted]
+        skipped = [download for download, wanted in zip(downloads, keep) if not wanted]
+        return kept, skipped
@@ -1,24 +1,19 @@
 import os
 import json
+import hashlib
+import threading
+import time
 from datetime import datetime
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+from google.auth.transport.requests import AuthorizedSession, Request
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import MediaFileUpload, build_http
 from googleapiclient.errors import HttpError
-
-class Color:
-    PURPLE = "\033[95m"
-    CYAN = "\033[96m"
-    DARK_CYAN = "\033[36m"
-    BLUE = "\033[94m"
-    GREEN = "\033[92m"
-    YELLOW = "\033[93m"
-    RED = "\033[91m"
-    BOLD = "\033[1m"
-    UNDERLINE = "\033[4m"
-    END = "\033[0m"
+from storage_backend import Color, StorageBackend
 
 SUCCESS_PAGE = """
 <!DOCTYPE html>
@@ -33,71 +28,113 @@ SUCCESS_PAGE = """
 </html>
 """
 
-class GoogleDriveClient:
+class TransientUploadError(Exception):
+    """Raised for responses that are worth retrying within the same upload session."""
+
+
+class UploadSessionExpired(Exception):
+    """Raised when Drive no longer knows a resumable upload session."""
+
+
+class FolderGone(Exception):
+    """Raised when a cached parent folder no longer exists in Drive."""
+
+    def __init__(self, folder_id):
+        super().__init__(f"folder {folder_id} no longer exists")
+        self.folder_id = folder_id
+
+
+class GoogleDriveClient(StorageBackend):
+    name = 'Google Drive'
     SCOPES = [
         'https://www.googleapis.com/auth/drive.file',
         'https://www.googleapis.com/auth/drive.metadata',
         'https://www.googleapis.com/auth/drive.appdata'
     ]
+    UPLOAD_URL = 'https://www.googleapis.com/upload/drive/v3/files'
+    # every chunk but the last must be a multiple of 256 KiB
+    CHUNK_ALIGNMENT = 256 * 1024
 
-    def __init__(self, config):
-        self.config = config
+    def __init__(self, config, bandwidth=None, metrics=None, log=print):
+        super().__init__(config, metrics, log)
+        # optional bandwidth.BandwidthLimiter for the bytes sent to Drive
+        self.bandwidth = bandwidth
         self.service = None
         self.credentials = None
         self.root_folder_id = None
+        # the Drive service object is not thread-safe
+        self.service_lock = threading.Lock()
+        # "<parent id>/<folder name>" -> folder id
+        self.folder_cache = self._load_folder_cache()
+        self.folder_cache_lock = threading.Lock()
+        self.folder_locks = {}
+        # folder id -> {file name: {'id', 'name', 'size', 'md5Checksum'}} of files already in Drive
+        self.folder_files = {}
+        # "<folder id>/<file name>:<size>" -> resumable session URI of unfinished uploads
+        self.upload_sessions = self._load_upload_sessions()
+        self.upload_sessions_lock = threading.Lock()
+        self.thread_local = threading.local()
 
     def authenticate(self):
         """Handle the OAuth flow and return True if successful."""
-        print(f"{Color.DARK_CYAN}Initializing Google Drive authentication...{Color.END}")
+        self.log(f"{Color.DARK_CYAN}Initializing Google Drive authentication...{Color.END}")
         
         creds = None
         token_file = self.config.get('token_file', 'token.json')
         secrets_file = self.config.get('client_secrets_file', 'client_secrets.json')
 
         if not os.path.exists(secrets_file):
-            print(f"{Color.RED}Error: {secrets_file} not found. Please configure OAuth credentials.{Color.END}")
+            self.log(f"{Color.RED}Error: {secrets_file} not found. Please configure OAuth credentials.{Color.END}")
             return False
 
         if os.path.exists(token_file):
             try:
                 creds = Credentials.from_authorized_user_file(token_file, self.SCOPES)
             except Exception as e:
-                print(f"{Color.YELLOW}Error reading token file: {e}{Color.END}")
+                self.log(f"{Color.YELLOW}Error reading token file: {e}{Color.END}")
 
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
-                print(f"{Color.DARK_CYAN}Refreshing expired token...{Color.END}")
+                self.log(f"{Color.DARK_CYAN}Refreshing expired token...{Color.END}")
                 try:
                     creds.refresh(Request())
                 except Exception as e:
-                    print(f"{Color.YELLOW}Token refresh failed: {e}. Initiating new authentication...{Color.END}")
+                    self.log(f"{Color.YELLOW}Token refresh failed: {e}. Initiating new authentication...{Color.END}")
                     creds = None
             
             if not creds:
                 try:
                     flow = InstalledAppFlow.from_client_secrets_file(secrets_file, self.SCOPES)
-                    print(f"{Color.DARK_CYAN}Please login in your browser...{Color.END}")
+                    self.log(f"{Color.DARK_CYAN}Please login in your browser...{Color.END}")
                     creds = flow.run_local_server(port=0, success_message=SUCCESS_PAGE)
                 except Exception as e:
-                    print(f"{Color.RED}Authentication failed: {e}{Color.END}")
+                    self.log(f"{Color.RED}Authentication failed: {e}{Color.END}")
                     return False
 
             with open(token_file, 'w') as token:
                 token.write(creds.to_json())
-                print(f"{Color.GREEN}Token saved to {token_file}{Color.END}")
+                self.log(f"{Color.GREEN}Token saved to {token_file}{Color.END}")
 
         try:
-            self.service = build('drive', 'v3', credentials=creds)
+            api_root_url = self.config.get('api_root_url')
+            if api_root_url:
+                # a stand-in for www.googleapis.com, such as the benchmark's mock server
+                document = json.loads(get_static_doc('drive', 'v3'))
+                document['rootUrl'] = api_root_url.rstrip('/') + '/'
+                self.service = build_from_document(document, credentials=creds)
+                self.UPLOAD_URL = f"{document['rootUrl']}upload/drive/v3/files"
+            else:
+                self.service = build('drive', 'v3', credentials=creds)
             self.credentials = creds
             
             # Get user email
             user_info = self.service.about().get(fields="user").execute()
             email = user_info['user']['emailAddress']
-            print(f"{Color.GREEN}Successfully authenticated as {email}{Color.END}")
+            self.log(f"{Color.GREEN}Successfully authenticated as {email}{Color.END}")
             
             return True
         except Exception as e:
-            print(f"{Color.RED}Failed to initialize Drive service: {e}{Color.END}")
+            self.log(f"{Color.RED}Failed to initialize Drive service: {e}{Color.END}")
             return False
 
     def _handle_upload_with_refresh(self, request):
@@ -107,67 +144,289 @@ class GoogleDriveClient:
         except HttpError as e:
             if e.resp.status in [401, 403]:
                 if self.credentials.refresh_token:
-                    print(f"{Color.YELLOW}Token expired, refreshing...{Color.END}")
+                    self.log(f"{Color.YELLOW}Token expired, refreshing...{Color.END}")
                     self.credentials.refresh(Request())
                     return self._handle_upload_with_refresh(request)
                 else:
-                    print(f"{Color.YELLOW}Token refresh failed, re-authenticating...{Color.END}")
+                    self.log(f"{Color.YELLOW}Token refresh failed, re-authenticating...{Color.END}")
                     if self.authenticate():
                         return self._handle_upload_with_refresh(request)
             raise
 
     def create_folder(self, folder_name, parent_id=None):
         """Create a folder in Google Drive and return its ID."""
+        try:
+            return self._create_folder(folder_name, parent_id)
+        except Exception as e:
+            self.log(f"{Color.RED}Failed to create folder {folder_name}: {str(e)}{Color.END}")
+            return None
+
+    def _create_folder(self, folder_name, parent_id):
         file_metadata = {
             'name': folder_name,
             'mimeType': 'application/vnd.google-apps.folder'
         }
         if parent_id:
             file_metadata['parents'] = [parent_id]
-        
+
+        folder = self._handle_upload_with_refresh(
+            self.service.files().create(body=file_metadata, fields='id')
+        )
+        return folder.get('id')
+
+    def _persists_folder_cache(self):
+        """Only a reused root folder keeps its folder IDs, each new root starts with new folders."""
+        return bool(self.config.get('folder_cache_file')) and self.config.get('reuse_root_folder', False)
+
+    def _load_folder_cache(self):
+        """Read the persisted folder ID cache, if one is configured."""
+        cache_file = self.config.get('folder_cache_file')
+        if not self._persists_folder_cache() or not os.path.exists(cache_file):
+            return {}
         try:
-            folder = self._handle_upload_with_refresh(
-                self.service.files().create(body=file_metadata, fields='id')
-            )
-            return folder.get('id')
-        except Exception as e:
-            print(f"{Color.RED}Failed to create folder {folder_name}: {str(e)}{Color.END}")
-            return None
+            with open(cache_file) as fd:
+                return json.load(fd)
+        except (OSError, ValueError) as e:
+            self.log(f"{Color.YELLOW}Ignoring unreadable folder cache {cache_file}: {e}{Color.END}")
+            return {}
+
+    def _save_folder_cache(self):
+        """Persist the folder ID cache. Must be called with folder_cache_lock held."""
+        cache_file = self.config.get('folder_cache_file')
+        if not self._persists_folder_cache():
+            return
+        with open(f"{cache_file}.tmp", 'w') as fd:
+            json.dump(self.folder_cache, fd)
+        os.replace(f"{cache_file}.tmp", cache_file)
+
+    def _forget_folder(self, folder_id):
+        """Drop a folder that is gone from Drive, and every folder cached below it, from the cache."""
+        with self.folder_cache_lock:
+            gone = [folder_id]
+            while gone:
+                parent = gone.pop()
+                self.folder_files.pop(parent, None)
+                for key, cached_id in list(self.folder_cache.items()):
+                    if cached_id == parent or key.startswith(f"{parent}/"):
+                        del self.folder_cache[key]
+                        if cached_id != parent:
+                            gone.append(cached_id)
+            self._save_folder_cache()
+
+    def _cached_folder_exists(self, folder_id):
+        """Whether a folder ID from the cache still names a folder that is not trashed."""
+        try:
+            with self.service_lock:
+                folder = self._handle_upload_with_refresh(
+                    self.service.files().get(fileId=folder_id, fields='id, trashed')
+                )
+        except HttpError as e:
+            if e.resp.status == 404:
+                return False
+            raise
+        return not folder.get('trashed', False)
+
+    def _folder_lock(self, key):
+        """Lock that lets only one caller look up or create a given folder."""
+        with self.folder_cache_lock:
+            return self.folder_locks.setdefault(key, threading.Lock())
+
+    def _find_or_create_folder(self, folder, parent_id):
+        """Return the ID of folder under parent_id, creating it when it does not exist."""
+        name = folder.replace('\\', '\\\\').replace("'", "\\'")
+        query = f"name='{name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        if parent_id:
+            query += f" and '{parent_id}' in parents"
+
+        try:
+            with self.service_lock:
+                results = self._handle_upload_with_refresh(
+                    self.service.files().list(
+                        q=query,
+                        spaces='drive',
+                        fields='files(id)'
+                    )
+                )
+                if results.get('files'):
+                    return results['files'][0]['id']
+                return self._create_folder(folder, parent_id)
+        except HttpError as e:
+            if parent_id and e.resp.status == 404:
+                raise FolderGone(parent_id)
+            raise
 
     def get_or_create_folder_path(self, folder_path, parent_id=None):
-        """Navigate or create folder structure in Google Drive."""
+        """Navigate or create folder structure in Google Drive, caching folder IDs by parent and name."""
+        with self.metrics.timer("drive_folder_path_seconds"):
+            return self._get_or_create_folder_path(folder_path, parent_id)
+
+    def _get_or_create_folder_path(self, folder_path, parent_id):
+        # a cached folder that was deleted in Drive answers 404, the path is then resolved again
+        for _ in range(len(folder_path.split(os.sep)) + 1):
+            try:
+                return self._resolve_folder_path(folder_path, parent_id)
+            except FolderGone as e:
+                if e.folder_id == parent_id:
+                    self.log(f"{Color.RED}Failed to navigate folders: {str(e)}{Color.END}")
+                    return None
+                self.log(f"{Color.YELLOW}Cached {e}, looking up {folder_path} again{Color.END}")
+                self._forget_folder(e.folder_id)
+        return None
+
+    def _resolve_folder_path(self, folder_path, parent_id):
         current_parent = parent_id
         for folder in folder_path.split(os.sep):
             if not folder:
                 continue
-            
-            query = f"name='{folder}' and mimeType='application/vnd.google-apps.folder'"
-            if current_parent:
-                query += f" and '{current_parent}' in parents"
-            
-            try:
+
+            key = f"{current_parent or ''}/{folder}"
+            self.metrics.inc("drive_folder_lookups_total")
+            folder_id = self.folder_cache.get(key)
+            if folder_id is None:
+                with self._folder_lock(key):
+                    # another caller may have resolved it while we waited
+                    folder_id = self.folder_cache.get(key)
+                    if folder_id is None:
+                        self.metrics.inc("drive_folder_cache_misses_total")
+                        try:
+                            folder_id = self._find_or_create_folder(folder, current_parent)
+                        except FolderGone:
+                            raise
+                        except Exception as e:
+                            self.log(f"{Color.RED}Failed to navigate folders: {str(e)}{Color.END}")
+                            return None
+                        if not folder_id:
+                            return None
+                        with self.folder_cache_lock:
+                            self.folder_cache[key] = folder_id
+                            self._save_folder_cache()
+
+            current_parent = folder_id
+
+        return current_parent
+
+    def _list_folder_files(self, folder_id):
+        """All files directly in a folder by name, fetched with one paginated listing."""
+        files = {}
+        page_token = None
+        while True:
+            with self.service_lock:
                 results = self._handle_upload_with_refresh(
                     self.service.files().list(
-                        q=query,
+                        q=f"'{folder_id}' in parents and trashed=false "
+                          "and mimeType!='application/vnd.google-apps.folder'",
                         spaces='drive',
-                        fields='files(id)'
+                        fields='nextPageToken, files(id, name, size, md5Checksum)',
+                        pageSize=1000,
+                        pageToken=page_token
                     )
                 )
-                
-                if results.get('files'):
-                    current_parent = results['files'][0]['id']
-                else:
-                    current_parent = self.create_folder(folder, current_parent)
-                    if not current_parent:
-                        return None
-            except Exception as e:
-                print(f"{Color.RED}Failed to navigate folders: {str(e)}{Color.END}")
+            for item in results.get('files', []):
+                files[item['name']] = item
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def find_file(self, folder_name, filename):
+        """Return the Drive metadata of filename in folder_name, or None if it is not there.
+
+        Each folder is listed once and its files kept for the rest of the run. Only a
+        reused root folder can hold files from earlier runs, so without
+        reuse_root_folder nothing is looked up.
+        """
+        if not self.config.get('reuse_root_folder', False):
+            return None
+        for attempt in range(2):
+            folder_id = self.get_or_create_folder_path(folder_name, self.root_folder_id)
+            if not folder_id:
                 return None
-        
-        return current_parent
 
-    def upload_file(self, local_path, folder_name, filename):
-        """Upload file to Google Drive with retry logic."""
+            try:
+                files = self.folder_files.get(folder_id)
+                if files is None:
+                    with self._folder_lock(f"files:{folder_id}"):
+                        files = self.folder_files.get(folder_id)
+                        if files is None:
+                            files = self.folder_files[folder_id] = self._list_folder_files(folder_id)
+                return files.get(filename)
+            except HttpError as e:
+                if e.resp.status != 404 or attempt:
+                    raise
+                # the cached folder was deleted in Drive, resolve the path again
+                self.log(
+                    f"{Color.YELLOW}Cached folder {folder_id} no longer exists, looking up {folder_name} again{Color.END}"
+                )
+                self._forget_folder(folder_id)
+
+    def _verify_checksum(self, uploaded, md5, filename):
+        """False, after removing the uploaded file, when Drive's MD5 differs from the expected one."""
+        drive_md5 = uploaded.get('md5Checksum') if isinstance(uploaded, dict) else None
+        if not md5 or not drive_md5 or drive_md5 == md5:
+            return True
+
+        self._log_failed_upload(filename, f"checksum mismatch, Drive has {drive_md5} instead of {md5}")
+        try:
+            with self.service_lock:
+                self._handle_upload_with_refresh(self.service.files().delete(fileId=uploaded['id']))
+        except Exception as e:
+            self.log(f"{Color.RED}Failed to remove the corrupt upload of {filename}: {str(e)}{Color.END}")
+        return False
+
+    def _thread_http(self):
+        """Authorized HTTP transport for the calling thread, as httplib2 is not thread-safe."""
+        http = getattr(self.thread_local, 'http', None)
+        if http is None:
+            http = self.thread_local.http = AuthorizedHttp(self.credentials, http=build_http())
+        return http
+
+    @staticmethod
+    def _is_retryable(error):
+        """Whether an upload error is worth retrying after a pause."""
+        if isinstance(error, HttpError):
+            return error.resp.status in (403, 408, 429) or error.resp.status >= 500
+        return isinstance(error, (OSError, httplib2.HttpLib2Error, TransientUploadError))
+
+    def _load_upload_sessions(self):
+        """Read the persisted resumable session URIs."""
+        sessions_file = self.config.get('upload_sessions_file', 'drive-upload-sessions.json')
+        if not sessions_file or not os.path.exists(sessions_file):
+            return {}
+        try:
+            with open(sessions_file) as fd:
+                return json.load(fd)
+        except (OSError, ValueError) as e:
+            self.log(f"{Color.YELLOW}Ignoring unreadable upload sessions {sessions_file}: {e}{Color.END}")
+            return {}
+
+    def _set_upload_session(self, key, session_uri):
+        """Remember (or with session_uri None, forget) the resumable session of an upload."""
+        sessions_file = self.config.get('upload_sessions_file', 'drive-upload-sessions.json')
+        with self.upload_sessions_lock:
+            if session_uri:
+                self.upload_sessions[key] = session_uri
+            elif self.upload_sessions.pop(key, None) is None:
+                return
+            if not sessions_file:
+                return
+            with open(f"{sessions_file}.tmp", 'w') as fd:
+                json.dump(self.upload_sessions, fd)
+            os.replace(f"{sessions_file}.tmp", sessions_file)
+
+    def upload_file(self, local_path, folder_name, filename, on_progress=None, md5=None):
+        """Upload file to Google Drive in resumable chunks, retrying with exponential backoff.
+
+        Returns the ID of the uploaded file, or False when the upload failed or Drive's
+        MD5 of the upload differs from md5.
+
+        The session URI is saved once the upload has started, so a later run continues
+        a half-finished upload instead of sending the whole file again.
+        """
+        return self._timed_upload("file", self._upload_file, local_path, folder_name, filename, on_progress, md5)
+
+    def _upload_file(self, local_path, folder_name, filename, on_progress, md5):
+        max_retries = int(self.config.get('max_retries', 3))
+        retry_delay = int(self.config.get('retry_delay', 5))
+
         try:
             folder_id = self.get_or_create_folder_path(folder_name, self.root_folder_id)
             if not folder_id:
@@ -177,44 +436,302 @@ class GoogleDriveClient:
                 'name': filename,
                 'parents': [folder_id]
             }
-            
+            total_size = os.path.getsize(local_path)
+            session_key = f"{folder_id}/{filename}:{total_size}"
             media = MediaFileUpload(
                 local_path,
+                chunksize=self._chunk_size(),
                 resumable=True
             )
 
-            max_retries = int(self.config.get('max_retries', 3))
-            retry_delay = int(self.config.get('retry_delay', 5))
-            failed_log = self.config.get('failed_log', 'failed-uploads.log')
+            def new_request():
+                return self.service.files().create(
+                    body=file_metadata,
+                    media_body=media,
+                    fields='id,md5Checksum'
+                )
 
-            for attempt in range(max_retries):
+            request = new_request()
+            saved_uri = self.upload_sessions.get(session_key)
+            if saved_uri:
+                # ask Drive how much of the saved session it holds, and continue from there
                 try:
-                    print(f"    Attempt {attempt + 1} of {max_retries}...")
-                    request = self.service.files().create(
-                        body=file_metadata,
-                        media_body=media,
-                        fields='id'
-                    )
-                    self._handle_upload_with_refresh(request)
-                    print(f"    {Color.GREEN}Success!{Color.END}")
-                    return True
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        print(f"    {Color.YELLOW}Retry after {retry_delay} seconds...{Color.END}")
-                        import time
-                        time.sleep(retry_delay)
-                    else:
-                        print(f"{Color.RED}Upload failed: {str(e)}{Color.END}")
-                        with open(failed_log, 'a') as log:
-                            log.write(f"{datetime.now()}: Failed to upload {filename} - {str(e)}\n")
+                    persisted = self._query_session(AuthorizedSession(self.credentials), saved_uri, total_size)
+                except Exception:
+                    persisted = None
+                if isinstance(persisted, dict):
+                    # the earlier run sent everything but did not get the answer
+                    self._set_upload_session(session_key, None)
+                    if not self._verify_checksum(persisted, md5, filename):
                         return False
+                    if on_progress:
+                        on_progress(total_size)
+                    return persisted.get('id', True)
+                if persisted is None:
+                    self._set_upload_session(session_key, None)
+                    saved_uri = None
+                else:
+                    self.log(f"    {Color.DARK_CYAN}Resuming earlier upload of {filename}{Color.END}")
+                    request.resumable_uri = saved_uri
+                    request.resumable_progress = persisted
+
+            http = self._thread_http()
+            bandwidth = self.bandwidth.stream() if self.bandwidth else None
         except Exception as e:
-            print(f"{Color.RED}Upload preparation failed: {str(e)}{Color.END}")
+            self.log(f"{Color.RED}Upload preparation failed: {str(e)}{Color.END}")
+            return False
+
+        response = None
+        attempt = 0
+        while response is None:
+            try:
+                if bandwidth:
+                    # whole chunks are sent at once, the caps hold on average over a chunk
+                    bandwidth.throttle(min(media.chunksize(), total_size - request.resumable_progress))
+                sent = request.resumable_progress
+                status, response = request.next_chunk(http=http)
+                self.metrics.inc("upload_bytes_total", (total_size if response else request.resumable_progress) - sent)
+                attempt = 0
+                if request.resumable_uri != saved_uri:
+                    saved_uri = request.resumable_uri
+                    self._set_upload_session(session_key, saved_uri)
+                if status and on_progress:
+                    on_progress(status.resumable_progress)
+
+            except HttpError as e:
+                if e.resp.status in (404, 410) and request.resumable_uri:
+                    # the session expired, start a new one from the beginning
+                    self.log(f"    {Color.YELLOW}Upload session expired, restarting {filename}...{Color.END}")
+                    self.metrics.inc("upload_session_restarts_total", mode="file")
+                    self._set_upload_session(session_key, None)
+                    request, saved_uri = new_request(), None
+                    continue
+                attempt += 1
+                if attempt > max_retries or not self._is_retryable(e):
+                    self._log_failed_upload(filename, e)
+                    return False
+                delay = retry_delay * 2 ** (attempt - 1)
+                self.metrics.inc("upload_retries_total", mode="file", reason=e.resp.status)
+                self.log(f"    {Color.YELLOW}Retry after {delay} seconds ({e.resp.status})...{Color.END}")
+                time.sleep(delay)
+
+            except Exception as e:
+                attempt += 1
+                if attempt > max_retries or not self._is_retryable(e):
+                    self._log_failed_upload(filename, e)
+                    return False
+                delay = retry_delay * 2 ** (attempt - 1)
+                self.metrics.inc("upload_retries_total", mode="file", reason=type(e).__name__)
+                self.log(f"    {Color.YELLOW}Retry after {delay} seconds ({str(e)})...{Color.END}")
+                time.sleep(delay)
+
+        self._set_upload_session(session_key, None)
+        if not self._verify_checksum(response, md5, filename):
             return False
+        if on_progress:
+            on_progress(total_size)
+        return response.get('id', True)
+
+    def _chunk_size(self):
+        """Configured upload chunk size rounded down to the required alignment."""
+        chunk_size = int(float(self.config.get('chunk_size_mb', 8)) * 1024 * 1024)
+        return max(self.CHUNK_ALIGNMENT, chunk_size - chunk_size % self.CHUNK_ALIGNMENT)
+
+    def _start_resumable_session(self, session, metadata, total_size):
+        """Open a resumable upload session and return its URI."""
+        headers = {'Content-Type': 'application/json; charset=UTF-8'}
+        if total_size:
+            headers['X-Upload-Content-Length'] = str(total_size)
+
+        response = session.post(
+            self.UPLOAD_URL,
+            params={'uploadType': 'resumable', 'fields': 'id,md5Checksum'},
+            headers=headers,
+            data=json.dumps(metadata)
+        )
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransientUploadError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response.headers['Location']
+
+    def _session_response(self, response):
+        """Return the uploaded file for a finished session, or the number of bytes Drive holds."""
+        if response.status_code in (200, 201):
+            return response.json()
+        if response.status_code == 308:
+            # Range: bytes=0-<last persisted byte>, absent when nothing was persisted
+            persisted = response.headers.get('Range', '')
+            return int(persisted.rpartition('-')[2]) + 1 if persisted else 0
+        if response.status_code in (404, 410):
+            raise UploadSessionExpired(f"HTTP {response.status_code}")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransientUploadError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        raise TransientUploadError(f"unexpected HTTP {response.status_code}")
+
+    def _put_chunk(self, session, session_uri, data, offset, total_size):
+        """Send data at offset of the session; total_size is None until the last chunk."""
+        total = total_size if total_size is not None else '*'
+        if data:
+            content_range = f"bytes {offset}-{offset + len(data) - 1}/{total}"
+        else:
+            content_range = f"bytes */{total}"
+        response = session.put(session_uri, headers={'Content-Range': content_range}, data=bytes(data))
+        return self._session_response(response)
+
+    def _query_session(self, session, session_uri, total_size):
+        """Ask Drive how much of the session it has persisted."""
+        return self._put_chunk(session, session_uri, b'', 0, total_size)
+
+    def upload_stream(self, open_stream, total_size, folder_name, filename, on_progress=None):
+        """Upload a stream to Google Drive without staging it on disk, returning the file ID or False.
+
+        open_stream(offset) must return a readable object positioned at offset, it is
+        called again to continue from the last byte Drive has persisted after the
+        source fails. Only one chunk is held in memory at a time. The bytes are hashed
+        as they are read and checked against Drive's MD5 once the upload is done.
+        """
+        return self._timed_upload("stream", self._upload_stream, open_stream, total_size, folder_name, filename, on_progress)
+
+    def _upload_stream(self, open_stream, total_size, folder_name, filename, on_progress):
+        max_retries = int(self.config.get('max_retries', 3))
+        retry_delay = int(self.config.get('retry_delay', 5))
+        chunk_size = self._chunk_size()
+
+        try:
+            folder_id = self.get_or_create_folder_path(folder_name, self.root_folder_id)
+            if not folder_id:
+                return False
+        except Exception as e:
+            self.log(f"{Color.RED}Upload preparation failed: {str(e)}{Color.END}")
+            return False
+
+        session = AuthorizedSession(self.credentials)
+        bandwidth = self.bandwidth.stream() if self.bandwidth else None
+        metadata = {'name': filename, 'parents': [folder_id]}
+        # a stream of unknown size cannot be matched to an earlier session
+        session_key = f"{folder_id}/{filename}:{total_size}" if total_size else None
+        session_uri = self.upload_sessions.get(session_key) if session_key else None
+        offset = 0  # bytes persisted by Drive
+        buffer = bytearray()  # bytes read from the source but not yet persisted
+        md5 = hashlib.md5()  # of every byte read from the source, None if they were not all read
+        stream = None
+        eof = False
+        attempt = 0
+
+        if session_uri:
+            try:
+                persisted = self._query_session(session, session_uri, total_size)
+                if isinstance(persisted, dict):
+                    self._set_upload_session(session_key, None)
+                    return persisted.get('id', True)
+                self.log(f"    {Color.DARK_CYAN}Resuming earlier upload of {filename}{Color.END}")
+                offset = persisted
+                md5 = None if offset else md5
+            except Exception:
+                self._set_upload_session(session_key, None)
+                session_uri = None
+
+        while True:
+            try:
+                if session_uri is None:
+                    session_uri = self._start_resumable_session(session, metadata, total_size)
+                    if session_key:
+                        self._set_upload_session(session_key, session_uri)
+                if stream is None and not eof:
+                    stream = open_stream(offset + len(buffer))
+                if not eof and len(buffer) < chunk_size:
+                    wanted = chunk_size - len(buffer)
+                    data = self._read_chunk(stream, wanted)
+                    buffer += data
+                    if md5:
+                        md5.update(data)
+                    eof = len(data) < wanted
+
+                if eof and total_size and offset + len(buffer) != total_size:
+                    raise TransientUploadError(f"source ended after {offset + len(buffer)} of {total_size} bytes")
+                total = offset + len(buffer) if eof else total_size or None
+
+                if bandwidth:
+                    bandwidth.throttle(len(buffer))
+                result = self._put_chunk(session, session_uri, buffer, offset, total)
+                self.metrics.inc("upload_bytes_total", len(buffer) if isinstance(result, dict) else result - offset)
+                if isinstance(result, dict):
+                    if session_key:
+                        self._set_upload_session(session_key, None)
+                    if not self._verify_checksum(result, md5 and md5.hexdigest(), filename):
+                        return False
+                    if on_progress:
+                        on_progress(offset + len(buffer))
+                    return result.get('id', True)
+
+                if not offset <= result <= offset + len(buffer):
+                    # the session and our buffer disagree, only a new session can fix that
+                    raise UploadSessionExpired(f"persisted offset {result} outside the buffered data")
+                del buffer[:result - offset]
+                offset = result
+                attempt = 0
+                if on_progress:
+                    on_progress(offset)
+
+            except InterruptedError:
+                raise
+
+            except UploadSessionExpired:
+                # start over with a new session and a fresh source
+                self.log(f"    {Color.YELLOW}Upload session expired, restarting {filename}...{Color.END}")
+                self.metrics.inc("upload_session_restarts_total", mode="stream")
+                if session_key:
+                    self._set_upload_session(session_key, None)
+                session_uri, offset, buffer, stream, eof = None, 0, bytearray(), None, False
+                md5 = hashlib.md5()
+
+            except Exception as e:
+                attempt += 1
+                if attempt > max_retries:
+                    self._log_failed_upload(filename, e)
+                    return False
+
+                delay = retry_delay * 2 ** (attempt - 1)
+                self.metrics.inc("upload_retries_total", mode="stream", reason=type(e).__name__)
+                self.log(f"    {Color.YELLOW}Retry after {delay} seconds ({str(e)})...{Color.END}")
+                time.sleep(delay)
+
+                if not eof:
+                    # the source may have failed as well, reopen it after the buffered data
+                    stream = None
+                if session_uri is None:
+                    continue
+                try:
+                    persisted = self._query_session(session, session_uri, total_size or None)
+                    if isinstance(persisted, dict):
+                        if session_key:
+                            self._set_upload_session(session_key, None)
+                        return persisted.get('id', True)
+                    if not offset <= persisted <= offset + len(buffer):
+                        raise UploadSessionExpired(f"persisted offset {persisted} outside the buffered data")
+                    del buffer[:persisted - offset]
+                    offset = persisted
+                except UploadSessionExpired:
+                    if session_key:
+                        self._set_upload_session(session_key, None)
+                    session_uri, offset, buffer, stream, eof = None, 0, bytearray(), None, False
+                    md5 = hashlib.md5()
+                except Exception:
+                    pass
 
     def initialize_root_folder(self):
-        """Create root folder with timestamp."""
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
-        root_folder_name = f"{self.config.get('root_folder_name', 'zoom-recording-downloader')}-{timestamp}"
-        self.root_folder_id = self.create_folder(root_folder_name)
+        """Create root folder with timestamp, or reuse a fixed root folder across runs."""
+        root_folder_name = self.config.get('root_folder_name', 'zoom-recording-downloader')
+        if self.config.get('reuse_root_folder', False):
+            self.root_folder_id = self.get_or_create_folder_path(root_folder_name)
+            # the ID may come from the folder cache without any API call, check it is still there
+            if self.root_folder_id and not self._cached_folder_exists(self.root_folder_id):
+                self.log(f"{Color.YELLOW}Cached root folder {self.root_folder_id} no longer exists, "
+                      f"looking it up again{Color.END}")
+                self._forget_folder(self.root_folder_id)
+                self.root_folder_id = self.get_or_create_folder_path(root_folder_name)
+        else:
+            timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
+            self.root_folder_id = self.create_folder(f"{root_folder_name}-{timestamp}")
         return self.root_folder_id is not None
\ No newline at end of file
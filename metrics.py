@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """Counters and latency histograms of one run, safe to update from any thread.
+
+    Metrics are identified by a name and keyword labels. They can be exported as
+    a JSON run report or in the Prometheus text format, written to a file for the
+    node exporter's textfile collector or served on /metrics.
+    """
+
+    def __init__(self, prefix="zoom_recording_downloader"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [count per bucket, sum, count]
+        self.started = time.time()
+        self.httpd = None
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def value(self, name, **labels):
+        """Sum of a counter over every label set that includes labels."""
+        wanted = set(self._key(name, labels)[1])
+        with self.lock:
+            return sum(
+                value for (counter, counter_labels), value in self.counters.items()
+                if counter == name and wanted <= set(counter_labels)
+            )
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[0][index] += 1
+                    break
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe how long the block took, also when it raises."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **labels)
+
+    def report(self):
+        """The run so far as a JSON serialisable dict."""
+        now = time.time()
+        with self.lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = []
+            for (name, labels), (buckets, total, count) in sorted(self.histograms.items()):
+                histograms.append({
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": count,
+                    "sum": round(total, 6),
+                    "mean": round(total / count, 6) if count else None,
+                    "buckets": {str(bound): bucket for bound, bucket in zip(BUCKETS, buckets)},
+                    "over": count - sum(buckets)
+                })
+
+        duration = now - self.started
+        throughput = {}
+        for direction in ("download", "upload"):
+            transferred = self.value(f"{direction}_bytes_total")
+            busy = sum(item["sum"] for item in histograms if item["name"] == f"{direction}_seconds")
+            throughput[direction] = {
+                "bytes": transferred,
+                # over the whole run, and over the time files were actually being transferred
+                "bytes_per_second": transferred / duration if duration else 0,
+                "per_transfer_bytes_per_second": transferred / busy if busy else None
+            }
+
+        return {
+            "started_at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "generated_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "duration_seconds": round(duration, 3),
+            "throughput": throughput,
+            "counters": counters,
+            "histograms": histograms
+        }
+
+    def prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_label_text(labels)} {value}")
+
+        for (name, labels), (buckets, total, count) in histograms:
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f"{metric}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_bucket{_label_text(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{metric}_sum{_label_text(labels)} {total}")
+            lines.append(f"{metric}_count{_label_text(labels)} {count}")
+
+        lines.append(f"# TYPE {self.prefix}_start_time_seconds gauge")
+        lines.append(f"{self.prefix}_start_time_seconds {self.started}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _write(path, text):
+        # written next to the target and renamed, readers never see half a file
+        with open(f"{path}.tmp", "w") as fd:
+            fd.write(text)
+        os.replace(f"{path}.tmp", path)
+
+    def write_report(self, path):
+        self._write(path, json.dumps(self.report(), indent=2))
+
+    def write_textfile(self, path):
+        self._write(path, self.prometheus())
+
+    def serve(self, host="0.0.0.0", port=9100):
+        """Serve the Prometheus text format on /metrics from a background thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
@@ -0,0 +1,90 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+class RateLimiter:
+    """Client-side rate limiter shared by every thread that talks to Zoom.
+
+    Each category (for example "users", "recordings" or "download") has a token
+    bucket refilled at its own rate. The rate starts at the configured maximum,
+    is halved whenever Zoom answers 429 and grows back slowly while requests
+    succeed. A 429 also pauses every category until its Retry-After has passed,
+    and the X-RateLimit-Remaining header slows a category down before the limit
+    is reached.
+    """
+
+    def __init__(self, requests_per_second=10, min_requests_per_second=0.5, retry_delay=1, max_retry_delay=60):
+        self.max_rate = float(requests_per_second)
+        self.min_rate = min(float(min_requests_per_second), self.max_rate)
+        self.retry_delay = float(retry_delay)
+        self.max_retry_delay = float(max_retry_delay)
+        self.lock = threading.Lock()
+        self.buckets = {}  # category -> [rate, tokens, last refill]
+        self.paused_until = 0.0
+
+    def _bucket(self, category):
+        bucket = self.buckets.get(category)
+        if bucket is None:
+            bucket = self.buckets[category] = [self.max_rate, 1.0, time.monotonic()]
+        return bucket
+
+    def acquire(self, category):
+        """Block until a request of this category may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                bucket = self._bucket(category)
+                rate, tokens, last = bucket
+                # allow a burst of up to one second worth of requests
+                tokens = min(max(rate, 1.0), tokens + (now - last) * rate)
+                bucket[1], bucket[2] = tokens, now
+
+                wait = self.paused_until - now
+                if wait <= 0 and tokens >= 1:
+                    bucket[1] = tokens - 1
+                    return
+                wait = max(wait, (1 - tokens) / rate)
+            time.sleep(wait)
+
+    def observe(self, category, response):
+        """Adapt the rate of a category to a Zoom response."""
+        with self.lock:
+            bucket = self._bucket(category)
+            if response.status_code == 429:
+                bucket[0] = max(self.min_rate, bucket[0] / 2)
+                retry_after = self.retry_after(response)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                return
+
+            limit = _header_int(response, "X-RateLimit-Limit")
+            remaining = _header_int(response, "X-RateLimit-Remaining")
+            if limit and remaining is not None and remaining < limit * 0.1:
+                # close to the limit, slow down before Zoom starts refusing
+                bucket[0] = max(self.min_rate, bucket[0] * 0.75)
+            elif response.status_code < 400:
+                bucket[0] = min(self.max_rate, bucket[0] + 0.1)
+
+    @staticmethod
+    def retry_after(response):
+        """Seconds to wait from a Retry-After header, in seconds or HTTP date form, or None."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def backoff(self, attempt):
+        """Exponential backoff with full jitter for the given retry attempt, starting at 0."""
+        return random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2 ** attempt))
+
+
+def _header_int(response, name):
+    value = response.headers.get(name)
+    return int(value) if value and value.isdigit() else None
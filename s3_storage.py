@@ -0,0 +1,335 @@
+import base64
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from storage_backend import Color, StorageBackend
+
+
+MIB = 1024 * 1024
+# every part but the last must be at least 5 MiB, and an upload can have up to 10000 parts
+MIN_PART_SIZE = 5 * MIB
+MAX_PARTS = 10000
+
+
+class S3Storage(StorageBackend):
+    """Uploads recordings to a bucket of Amazon S3 or of an S3 compatible store such as MinIO.
+
+    Files of part_size_mb or more are sent as multipart uploads, max_concurrency parts
+    at a time. A multipart upload that did not finish is left in the bucket, and the
+    next upload of the same key continues it, only sending the parts it is missing.
+    The MD5 of a file is kept in its md5 metadata, as the ETag of a multipart upload
+    is not the MD5 of the file.
+    """
+
+    name = 'S3'
+
+    def __init__(self, config, bandwidth=None, metrics=None, log=print):
+        super().__init__(config, metrics, log)
+        # optional bandwidth.BandwidthLimiter for the bytes sent to S3
+        self.bandwidth = bandwidth
+        self.bucket = config.get('bucket', '')
+        self.prefix = config.get('prefix', 'zoom-recording-downloader').strip('/')
+        self.part_size = max(MIN_PART_SIZE, int(float(config.get('part_size_mb', 64)) * MIB))
+        # parts of one file sent at the same time, each holds a part in memory
+        self.max_concurrency = max(1, int(config.get('max_concurrency', 4)))
+        self.client = boto3.client(
+            's3',
+            endpoint_url=config.get('endpoint_url') or None,
+            region_name=config.get('region') or None,
+            # the default credential chain is used when these are not set
+            aws_access_key_id=config.get('access_key_id') or None,
+            aws_secret_access_key=config.get('secret_access_key') or None,
+            config=Config(
+                # every part being sent, plus the lookups of other workers
+                max_pool_connections=self.max_concurrency * self.max_concurrent_uploads + 4,
+                retries={'mode': 'standard', 'max_attempts': int(config.get('max_retries', 3)) + 1},
+                # MinIO and most other S3 compatible stores want 'path'
+                s3={'addressing_style': config.get('addressing_style', 'auto')}
+            )
+        )
+
+    def connect(self):
+        """Check that the bucket can be reached with the configured credentials."""
+        if not self.bucket:
+            self.log(f"{Color.RED}Error: no S3 bucket configured.{Color.END}")
+            return False
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+        except Exception as e:
+            self.log(f"{Color.RED}Could not reach S3 bucket {self.bucket}: {e}{Color.END}")
+            return False
+        self.log(f"{Color.GREEN}Uploading to s3://{self.bucket}/{self.prefix}{Color.END}")
+        return True
+
+    def _key(self, folder_name, filename):
+        folder = folder_name.replace(os.sep, '/').strip('/')
+        return '/'.join(part for part in (self.prefix, folder, filename) if part)
+
+    def find_file(self, folder_name, filename):
+        """Return the size and MD5 of filename in folder_name, or None if it is not there."""
+        key = self._key(folder_name, filename)
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response['Error'].get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {'id': key, 'size': head['ContentLength'], 'md5Checksum': head.get('Metadata', {}).get('md5')}
+
+    def _part_size(self, total_size):
+        """part_size_mb, raised in whole MiB for files that would need more than MAX_PARTS parts."""
+        needed = -(-total_size // MAX_PARTS)
+        return max(self.part_size, -(-needed // MIB) * MIB)
+
+    @staticmethod
+    def _content_md5(data):
+        return base64.b64encode(hashlib.md5(data).digest()).decode('ascii')
+
+    def _count(self, response, size, mode):
+        """Count the bytes S3 acknowledged, and the retries botocore needed for them."""
+        self.metrics.inc("upload_bytes_total", size)
+        retries = response['ResponseMetadata'].get('RetryAttempts', 0)
+        if retries:
+            self.metrics.inc("upload_retries_total", retries, mode=mode, reason="s3")
+
+    def _put_object(self, key, data, md5, mode):
+        """Upload data as one request, S3 refuses it if it does not match its MD5."""
+        if self.bandwidth:
+            self.bandwidth.stream().throttle(len(data))
+        response = self.client.put_object(
+            Bucket=self.bucket, Key=key, Body=bytes(data), ContentMD5=self._content_md5(data),
+            Metadata={'md5': md5}
+        )
+        self._count(response, len(data), mode)
+
+    def _resume(self, key, total_size, part_size, read_part=None):
+        """Find the unfinished multipart upload of key left by an earlier run.
+
+        Returns its upload ID and {part number: ETag} of the parts it holds, or
+        (None, {}). The parts must have the sizes of part_size parts of total_size
+        bytes and, with read_part(number), match the data by MD5. The newest upload
+        that holds such parts is kept, any other unfinished upload of key is aborted.
+        """
+        uploads = []
+        for page in self.client.get_paginator('list_multipart_uploads').paginate(Bucket=self.bucket, Prefix=key):
+            uploads += [upload for upload in page.get('Uploads', []) if upload['Key'] == key]
+        uploads.sort(key=lambda upload: upload['Initiated'], reverse=True)
+
+        upload_id, parts = None, {}
+        for upload in uploads:
+            if upload_id is None and total_size:
+                parts = self._listed_parts(key, upload['UploadId'], total_size, part_size, read_part)
+                if parts:
+                    upload_id = upload['UploadId']
+                    continue
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload['UploadId'])
+        return upload_id, parts or {}
+
+    def _listed_parts(self, key, upload_id, total_size, part_size, read_part):
+        """{part number: ETag} of the parts of an upload, or None if one does not fit the file."""
+        parts = {}
+        pages = self.client.get_paginator('list_parts').paginate(Bucket=self.bucket, Key=key, UploadId=upload_id)
+        for part in (part for page in pages for part in page.get('Parts', [])):
+            number = part['PartNumber']
+            if part['Size'] != min(part_size, total_size - (number - 1) * part_size):
+                return None
+            if read_part and hashlib.md5(read_part(number)).hexdigest() != part['ETag'].strip('"'):
+                return None
+            parts[number] = part['ETag']
+        return parts
+
+    def _send_parts(self, key, upload_id, parts, read_parts, mode, on_progress, stored):
+        """Upload the (part number, data) pairs of read_parts, max_concurrency at a time, into parts.
+
+        read_parts is only advanced while a part can be sent, so at most
+        max_concurrency + 1 parts are held in memory. stored is the number of bytes
+        that S3 already holds, on_progress(bytes) follows it.
+        """
+        slots = threading.Semaphore(self.max_concurrency)
+        lock = threading.Lock()
+        errors = []
+
+        def send(number, data):
+            nonlocal stored
+            try:
+                if self.bandwidth:
+                    self.bandwidth.stream().throttle(len(data))
+                response = self.client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number,
+                    Body=bytes(data), ContentMD5=self._content_md5(data)
+                )
+                self._count(response, len(data), mode)
+                with lock:
+                    parts[number] = response['ETag']
+                    stored += len(data)
+                    if on_progress:
+                        on_progress(stored)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for number, data in read_parts:
+                slots.acquire()
+                if errors:
+                    break
+                executor.submit(send, number, data)
+        if errors:
+            raise errors[0]
+
+    def _complete(self, key, upload_id, parts):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': parts[number]} for number in sorted(parts)]}
+        )
+
+    def upload_file(self, local_path, folder_name, filename, on_progress=None, md5=None):
+        """Upload a file to S3, returning its key or False when the upload failed.
+
+        Files smaller than a part are sent in one request. The parts an earlier run
+        already sent are checked against the file by MD5 and kept, the others are sent
+        max_concurrency at a time.
+        """
+        return self._timed_upload("file", self._upload_file, local_path, folder_name, filename, on_progress, md5)
+
+    def _upload_file(self, local_path, folder_name, filename, on_progress, md5):
+        key = self._key(folder_name, filename)
+        try:
+            total_size = os.path.getsize(local_path)
+            part_size = self._part_size(total_size)
+
+            def read_part(number):
+                with open(local_path, 'rb') as fd:
+                    fd.seek((number - 1) * part_size)
+                    return fd.read(part_size)
+
+            if total_size < part_size:
+                data = read_part(1)
+                self._put_object(key, data, md5 or hashlib.md5(data).hexdigest(), "file")
+            else:
+                upload_id, parts = self._resume(key, total_size, part_size, read_part)
+                if upload_id:
+                    self.log(
+                        f"    {Color.DARK_CYAN}Resuming earlier upload of {filename}, "
+                        f"{len(parts)} parts are in S3{Color.END}"
+                    )
+                else:
+                    upload_id = self.client.create_multipart_upload(
+                        Bucket=self.bucket, Key=key, Metadata={'md5': md5} if md5 else {}
+                    )['UploadId']
+
+                stored = sum(min(part_size, total_size - (number - 1) * part_size) for number in parts)
+                missing = [number for number in range(1, -(-total_size // part_size) + 1) if number not in parts]
+                self._send_parts(
+                    key, upload_id, parts, ((number, read_part(number)) for number in missing),
+                    "file", on_progress, stored
+                )
+                self._complete(key, upload_id, parts)
+        except Exception as e:
+            self._log_failed_upload(filename, e)
+            return False
+
+        if on_progress:
+            on_progress(total_size)
+        return key
+
+    def upload_stream(self, open_stream, total_size, folder_name, filename, on_progress=None):
+        """Upload a stream to S3 without staging it on disk, returning its key or False.
+
+        Parts are read from the stream while earlier ones are being sent. When reading
+        or sending fails, the stream is reopened after the parts S3 acknowledged, up
+        to max_retries times with a doubling retry_delay. When an earlier run left a
+        multipart upload of the same size, the stream is opened after the parts S3
+        already holds. Streamed files have no md5 metadata, unless they fit in one part.
+        """
+        return self._timed_upload(
+            "stream", self._upload_stream, open_stream, total_size, folder_name, filename, on_progress
+        )
+
+    def _upload_stream(self, open_stream, total_size, folder_name, filename, on_progress):
+        max_retries = int(self.config.get('max_retries', 3))
+        retry_delay = float(self.config.get('retry_delay', 5))
+        key = self._key(folder_name, filename)
+        part_size = self._part_size(total_size)
+        upload_id, parts = None, {}
+        attempt = 0
+        try:
+            # a stream of unknown size cannot be matched to an earlier upload
+            upload_id, parts = self._resume(key, total_size, part_size) if total_size else (None, {})
+            if upload_id:
+                self.log(f"    {Color.DARK_CYAN}Resuming earlier upload of {filename}{Color.END}")
+        except Exception as e:
+            self._log_failed_upload(filename, e)
+            return False
+
+        while True:
+            try:
+                # the stream is read from the first missing part on, later parts are sent again
+                first = 1
+                while first in parts:
+                    first += 1
+                parts = {number: etag for number, etag in parts.items() if number < first}
+                stored = (first - 1) * part_size
+                if on_progress:
+                    on_progress(stored)
+
+                stream = open_stream(stored)
+                data = self._read_chunk(stream, part_size)
+                if upload_id is None and len(data) < part_size:
+                    # the whole file fits in one request
+                    if total_size and len(data) != total_size:
+                        raise Exception(f"source ended after {len(data)} of {total_size} bytes")
+                    self._put_object(key, data, hashlib.md5(data).hexdigest(), "stream")
+                    stored = len(data)
+                    break
+
+                if upload_id is None:
+                    upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)['UploadId']
+                read = stored
+
+                def read_parts():
+                    nonlocal data, read
+                    number = first
+                    while data:
+                        if len(data) < part_size and total_size and read + len(data) != total_size:
+                            # a short part is only valid as the last one
+                            raise Exception(f"source ended after {read + len(data)} of {total_size} bytes")
+                        read += len(data)
+                        yield number, data
+                        if len(data) < part_size:
+                            return
+                        number += 1
+                        data = self._read_chunk(stream, part_size)
+
+                self._send_parts(key, upload_id, parts, read_parts(), "stream", on_progress, stored)
+                if total_size and read != total_size:
+                    raise Exception(f"source ended after {read} of {total_size} bytes")
+                self._complete(key, upload_id, parts)
+                stored = read
+                break
+
+            except InterruptedError:
+                raise
+
+            except Exception as e:
+                attempt += 1
+                if attempt > max_retries:
+                    self._log_failed_upload(filename, e)
+                    return False
+
+                # S3 keeps the parts it acknowledged, the next attempt reopens the source after them
+                delay = retry_delay * 2 ** (attempt - 1)
+                self.metrics.inc("upload_retries_total", mode="stream", reason=type(e).__name__)
+                self.log(f"    {Color.YELLOW}Retry after {delay} seconds ({str(e)})...{Color.END}")
+                time.sleep(delay)
+
+        if on_progress:
+            on_progress(stored)
+        return key
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    run_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    node TEXT NOT NULL,
+    status TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (run_id, job)
+);
+"""
+
+# lease status: held by a node that is working on the job, or done
+LEASED = "leased"
+DONE = "done"
+
+
+def shard_for(key, shard_count):
+    """Shard of key among shard_count shards, by rendezvous hashing.
+
+    Every node computes the same answer without talking to the others, and when
+    the shard count changes only the keys of the added or removed shard move.
+    """
+    return max(range(shard_count), key=lambda shard: hashlib.sha256(f"{shard}:{key}".encode("utf-8")).digest())
+
+
+def default_node_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class HashShard:
+    """Static share of the jobs: a node works on the keys that hash to its index.
+
+    Nothing is shared between the nodes, so the jobs of a node that crashed are
+    only done when that shard runs again.
+    """
+
+    def __init__(self, index, count):
+        if not 0 <= index < count:
+            raise ValueError(f"shard index {index} is not between 0 and {count - 1}")
+        self.index = index
+        self.count = count
+
+    def claim(self, key):
+        return shard_for(key, self.count) == self.index
+
+    def finish(self, key, success):
+        pass
+
+    def unfinished(self, keys):
+        # other shards are not tracked, there is nothing to wait for
+        return []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class LeaseStore:
+    """Jobs leased from an SQLite database that every node can reach, e.g. on a shared volume.
+
+    A node claims a job by writing a lease that expires after lease_seconds, and
+    renews the leases it holds from a background thread while it works. A finished
+    job is marked done, a failed one is released for any node to retry. When a
+    node dies its leases run out and another node claims the jobs again. Jobs are
+    kept per run_id: nodes sharing one split its jobs, and only a new run_id starts
+    with all jobs open, a done job stays done for its run_id. The database uses
+    a rollback journal rather than WAL, which does not work on network file systems,
+    and the expiry times are wall clock times, so the nodes' clocks must agree.
+    """
+
+    def __init__(self, path, run_id, node_id=None, lease_seconds=600, log=print):
+        self.path = path
+        self.run_id = run_id
+        self.node_id = node_id or default_node_id()
+        self.lease_seconds = float(lease_seconds)
+        self.log = log
+        self.local = threading.local()
+        self.stop_event = threading.Event()
+        self.thread = None
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # autocommit, transactions are started explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=DELETE")
+            self.local.conn = conn
+        return conn
+
+    def _transaction(self, statements):
+        """Run statements(conn) under the database write lock, so claims of different nodes do not interleave."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(conn)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, key):
+        """Lease the job key for this node, False if it is done or another node holds a live lease."""
+        def statements(conn):
+            now = time.time()
+            row = conn.execute(
+                "SELECT node, status, expires_at FROM leases WHERE run_id = ? AND job = ?", (self.run_id, key)
+            ).fetchone()
+            if row is not None:
+                node, status, expires_at = row
+                if status == DONE or (node != self.node_id and expires_at > now):
+                    return False
+                if node != self.node_id:
+                    self.log(f"==> Taking over {key} from {node}, whose lease expired")
+            conn.execute(
+                """
+                INSERT INTO leases (run_id, job, node, status, expires_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (run_id, job) DO UPDATE SET
+                    node = excluded.node, status = excluded.status, expires_at = excluded.expires_at
+                """,
+                (self.run_id, key, self.node_id, LEASED, now + self.lease_seconds)
+            )
+            return True
+
+        return self._transaction(statements)
+
+    def finish(self, key, success):
+        """Mark a job done, or give up its lease so that any node can retry it."""
+        if success:
+            sql = "UPDATE leases SET status = ? WHERE run_id = ? AND job = ? AND node = ?"
+            params = (DONE, self.run_id, key, self.node_id)
+        else:
+            sql = "DELETE FROM leases WHERE run_id = ? AND job = ? AND node = ? AND status != ?"
+            params = (self.run_id, key, self.node_id, DONE)
+        self._transaction(lambda conn: conn.execute(sql, params))
+
+    def unfinished(self, keys):
+        """The keys that are not done yet, by any node."""
+        done = {
+            row[0] for row in self._connection().execute(
+                "SELECT job FROM leases WHERE run_id = ? AND status = ?", (self.run_id, DONE)
+            )
+        }
+        return [key for key in keys if key not in done]
+
+    def renew(self):
+        """Extend every lease this node holds."""
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE leases SET expires_at = ? WHERE run_id = ? AND node = ? AND status = ?",
+            (time.time() + self.lease_seconds, self.run_id, self.node_id, LEASED)
+        ))
+
+    def start(self):
+        """Renew the leases of this node in the background, three times per lease period."""
+        self.thread = threading.Thread(target=self._renew_loop, daemon=True)
+        self.thread.start()
+
+    def _renew_loop(self):
+        while not self.stop_event.wait(self.lease_seconds / 3):
+            try:
+                self.renew()
+            except sqlite3.Error as e:
+                # the next attempt may still be in time, the lease only runs out after two misses
+                self.log(f"### Could not renew the leases in {self.path}: {e}")
+
+    def stop(self):
+        self.stop_event.set()
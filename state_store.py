@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    uuid TEXT PRIMARY KEY,
+    user_id TEXT,
+    status TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    file_id TEXT PRIMARY KEY,
+    meeting_uuid TEXT NOT NULL,
+    status TEXT NOT NULL,
+    size INTEGER,
+    checksum TEXT,
+    drive_file_id TEXT,
+    path TEXT,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS files_meeting_uuid ON files (meeting_uuid);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_id TEXT PRIMARY KEY,
+    synced_through TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# file status: downloaded (waiting for upload), complete or failed
+DOWNLOADED = "downloaded"
+COMPLETE = "complete"
+FAILED = "failed"
+
+# meeting uuid of the files imported from the completed log of earlier versions
+LEGACY_MEETING = ""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StateStore:
+    """Download state kept in SQLite, keyed by meeting uuid and recording file id.
+
+    Every thread gets its own connection and the database runs in WAL mode, so
+    download and upload workers can record progress while the main thread reads.
+    Each update is its own transaction, a finished file stays finished even if
+    the process dies right after.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def is_meeting_complete(self, meeting_uuid):
+        row = self._connection().execute(
+            "SELECT 1 FROM meetings WHERE uuid = ? AND status = ?", (meeting_uuid, COMPLETE)
+        ).fetchone()
+        return row is not None
+
+    def get_file(self, file_id):
+        """Return the stored row of a recording file as a dict, or None."""
+        conn = self._connection()
+        cursor = conn.execute("SELECT * FROM files WHERE file_id = ?", (file_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def mark_file(self, meeting_uuid, file_id, status, size=None, checksum=None, drive_file_id=None, path=None):
+        with self._connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO files (file_id, meeting_uuid, status, size, checksum, drive_file_id, path, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (file_id) DO UPDATE SET
+                    meeting_uuid = excluded.meeting_uuid,
+                    status = excluded.status,
+                    size = COALESCE(excluded.size, size),
+                    checksum = COALESCE(excluded.checksum, checksum),
+                    drive_file_id = COALESCE(excluded.drive_file_id, drive_file_id),
+                    path = COALESCE(excluded.path, path),
+                    updated_at = excluded.updated_at
+                """,
+                (file_id, meeting_uuid, status, size, checksum, drive_file_id, path, _now())
+            )
+
+    def mark_meeting(self, meeting_uuid, status, user_id=None):
+        with self._connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO meetings (uuid, user_id, status, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (uuid) DO UPDATE SET
+                    user_id = COALESCE(excluded.user_id, user_id),
+                    status = excluded.status,
+                    updated_at = excluded.updated_at
+                """,
+                (meeting_uuid, user_id, status, _now())
+            )
+
+    def sync_state(self):
+        """Return {user id: synced through timestamp} for incremental runs."""
+        return dict(self._connection().execute("SELECT user_id, synced_through FROM sync_state"))
+
+    def set_synced_through(self, user_id, synced_through):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (user_id, synced_through) VALUES (?, ?)",
+                (user_id, synced_through)
+            )
+
+    def _imported(self, conn, key):
+        return conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone() is not None
+
+    def import_completed_log(self, log_path):
+        """One-time import of a completed downloads log, returns the count.
+
+        Earlier versions logged the ID of the last recording file of each finished
+        meeting, not its uuid. Those IDs are stored as complete files that have no
+        meeting (LEGACY_MEETING), see is_legacy_complete().
+        """
+        key = f"imported-files:{os.path.abspath(log_path)}"
+        conn = self._connection()
+        if self._imported(conn, key) or not os.path.exists(log_path):
+            return 0
+
+        with open(log_path) as fd:
+            file_ids = {line.strip() for line in fd if line.strip()}
+
+        now = _now()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO files (file_id, meeting_uuid, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(file_id, LEGACY_MEETING, COMPLETE, now) for file_id in file_ids]
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, now))
+        return len(file_ids)
+
+    def is_legacy_complete(self, file_id):
+        """Whether file_id was the last file of a meeting the completed log of an earlier version lists."""
+        row = self._connection().execute(
+            "SELECT 1 FROM files WHERE file_id = ? AND meeting_uuid = ? AND status = ?",
+            (file_id, LEGACY_MEETING, COMPLETE)
+        ).fetchone()
+        return row is not None
+
+    def import_sync_state(self, state_path):
+        """One-time import of a JSON sync state file, returns the number of users."""
+        key = f"imported:{os.path.abspath(state_path)}"
+        conn = self._connection()
+        if self._imported(conn, key) or not os.path.exists(state_path):
+            return 0
+
+        with open(state_path) as fd:
+            sync_state = json.load(fd)
+
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO sync_state (user_id, synced_through) VALUES (?, ?)",
+                list(sync_state.items())
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, _now()))
+        return len(sync_state)
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from metrics import Metrics
+
+
+class Color:
+    PURPLE = "\033[95m"
+    CYAN = "\033[96m"
+    DARK_CYAN = "\033[36m"
+    BLUE = "\033[94m"
+    GREEN = "\033[92m"
+    YELLOW = "\033[93m"
+    RED = "\033[91m"
+    BOLD = "\033[1m"
+    UNDERLINE = "\033[4m"
+    END = "\033[0m"
+
+
+class StorageBackend:
+    """Remote storage that downloaded recordings are uploaded to, such as Google Drive or S3.
+
+    The download pool asks find_file() whether a recording file is already stored,
+    then downloads it and hands it to upload_file() or, with stream_uploads, sends
+    it straight from Zoom through upload_stream(). Files are addressed by the
+    folder and file name the recording's format_filename() gives. Both upload
+    methods return an ID of the stored file, True when there is none, or False when
+    the upload failed; they are called from several worker threads at once.
+    """
+
+    name = "remote storage"
+
+    def __init__(self, config, metrics=None, log=print):
+        self.config = config
+        # messages of the worker threads go through the downloader's log
+        self.log = log
+        # uploads are counted and timed here
+        self.metrics = metrics or Metrics()
+        # send files from Zoom without staging them in the download directory
+        self.stream_uploads = bool(config.get('stream_uploads', False))
+        # downloaded files waiting for an upload worker, downloads pause when it is full
+        self.upload_queue_size = max(1, int(config.get('upload_queue_size', 4)))
+        self.max_concurrent_uploads = max(1, int(config.get('max_concurrent_uploads', 2)))
+
+    def find_file(self, folder_name, filename):
+        """Return {'id', 'size', 'md5Checksum'} of a stored file, or None if it is not stored."""
+        return None
+
+    def upload_file(self, local_path, folder_name, filename, on_progress=None, md5=None):
+        """Upload a downloaded file, failing if the stored file's MD5 differs from md5.
+
+        on_progress(bytes) is called with the number of bytes stored so far.
+        """
+        raise NotImplementedError
+
+    def upload_stream(self, open_stream, total_size, folder_name, filename, on_progress=None):
+        """Upload a stream without staging it on disk.
+
+        open_stream(offset) must return a readable object positioned at offset, it is
+        called again to continue an interrupted upload. total_size is 0 when unknown.
+        """
+        raise NotImplementedError
+
+    def _log_failed_upload(self, filename, error):
+        failed_log = self.config.get('failed_log', 'failed-uploads.log')
+        self.log(f"{Color.RED}Upload failed: {str(error)}{Color.END}")
+        with open(failed_log, 'a') as log:
+            log.write(f"{datetime.now()}: Failed to upload {filename} - {str(error)}\n")
+
+    def _timed_upload(self, mode, upload, *args):
+        """Run an upload, recording its duration and outcome in metrics."""
+        with self.metrics.timer("upload_seconds", mode=mode):
+            result = upload(*args)
+        self.metrics.inc("uploads_total", mode=mode, result="ok" if result else "failed")
+        return result
+
+    @staticmethod
+    def _read_chunk(stream, size):
+        """Read up to size bytes from stream, returning less only at the end of the stream."""
+        data = bytearray()
+        while len(data) < size:
+            block = stream.read(size - len(data))
+            if not block:
+                break
+            data += block
+        return data
@@ -0,0 +1,130 @@
+import pytest
+
+from file_selection import SelectionRules
+
+MIB = 1024 * 1024
+
+PREFER_SHARED_SCREEN = {"file_type": "MP4", "prefer": ["shared_screen_with_speaker_view", "active_speaker"]}
+
+
+def download(file_type, recording_type, size=10 * MIB, extension=None):
+    """A file as get_downloads() returns it."""
+    return (file_type, extension or file_type, f"https://zoom.us/rec/{recording_type}", recording_type,
+            f"{recording_type}-{file_type}", size)
+
+
+SHARED = download("MP4", "shared_screen_with_speaker_view")
+SHARED_PART_2 = download("MP4", "shared_screen_with_speaker_view", size=20 * MIB)
+SPEAKER = download("MP4", "active_speaker")
+GALLERY = download("MP4", "gallery_view")
+AUDIO = download("M4A", "audio_only")
+CHAT = download("CHAT", "chat_file", size=1024, extension="TXT")
+TIMELINE = download("TIMELINE", "TIMELINE", size=2048, extension="JSON")
+
+
+@pytest.mark.parametrize("rules, default, files, kept", [
+    pytest.param([], "include", [SHARED, AUDIO, CHAT], [SHARED, AUDIO, CHAT], id="no rules keep everything"),
+    pytest.param([], "exclude", [SHARED, AUDIO], [], id="no rules with exclude default"),
+    pytest.param(
+        [{"action": "exclude", "file_type": ["timeline", "chat"]}], "include",
+        [SHARED, CHAT, TIMELINE], [SHARED], id="exclude by file type in any case"
+    ),
+    pytest.param(
+        [{"file_type": "M4A"}, {"action": "exclude", "file_type": ["M4A", "MP4"]}], "include",
+        [SHARED, AUDIO], [AUDIO], id="first matching rule wins"
+    ),
+    pytest.param(
+        [{"action": "exclude", "file_extension": "json"}], "include",
+        [SHARED, TIMELINE], [SHARED], id="file extension"
+    ),
+    pytest.param(
+        [{"recording_type": ["active_speaker", "chat_file"]}], "exclude",
+        [SHARED, SPEAKER, CHAT], [SPEAKER, CHAT], id="recording type with exclude default"
+    ),
+    pytest.param(
+        [PREFER_SHARED_SCREEN], "include",
+        [SPEAKER, SHARED, GALLERY, AUDIO], [SHARED, AUDIO], id="both preferred types keep the first"
+    ),
+    pytest.param(
+        [PREFER_SHARED_SCREEN], "include",
+        [GALLERY, SPEAKER, CHAT], [SPEAKER, CHAT], id="only the fallback type"
+    ),
+    pytest.param(
+        [PREFER_SHARED_SCREEN], "include",
+        [GALLERY, AUDIO], [AUDIO], id="neither preferred type"
+    ),
+    pytest.param(
+        [PREFER_SHARED_SCREEN], "include",
+        [SHARED, SPEAKER, SHARED_PART_2], [SHARED, SHARED_PART_2], id="every file of the preferred type"
+    ),
+    pytest.param(
+        [{"action": "exclude", "max_size_mb": 0.5}], "include",
+        [SHARED, CHAT, TIMELINE], [SHARED], id="max size"
+    ),
+    pytest.param(
+        [{"min_size_mb": 15}], "exclude",
+        [SHARED, SHARED_PART_2], [SHARED_PART_2], id="min size"
+    ),
+    pytest.param(
+        [{"min_size_mb": 10, "max_size_mb": 10}], "exclude",
+        [SHARED, SHARED_PART_2, CHAT], [SHARED], id="size bounds are inclusive"
+    ),
+])
+def test_select(rules, default, files, kept):
+    selection = SelectionRules(rules, default)
+
+    selected, skipped = selection.select({"topic": "Weekly sync"}, files)
+
+    assert selected == kept
+    assert skipped == [file for file in files if file not in kept]
+
+
+@pytest.mark.parametrize("topic, kept", [
+    ("Weekly sync", [SHARED]),
+    ("weekly SYNC", [SHARED]),
+    ("Test meeting", []),
+    ("", []),
+    (None, []),
+])
+def test_topic_matches_regular_expression(topic, kept):
+    selection = SelectionRules([{"topic": "(?i)^weekly"}], "exclude")
+
+    assert selection.select({"topic": topic}, [SHARED])[0] == kept
+
+
+@pytest.mark.parametrize("users, kept", [
+    (("user@example.com", "z8yCxjabcdEFGHfp8uQ"), [SHARED]),
+    (("USER@example.com", None), [SHARED]),
+    (("other@example.com", "z8yCxjabcdEFGHfp8uQ"), [SHARED]),
+    (("other@example.com", "other-id"), []),
+    ((), []),
+])
+def test_user_matches_email_or_id(users, kept):
+    selection = SelectionRules([{"user": ["user@example.com", "z8yCxjabcdEFGHfp8uQ"]}], "exclude")
+
+    assert selection.select({"topic": "Weekly sync"}, [SHARED], users=users)[0] == kept
+
+
+def test_all_conditions_of_a_rule_must_match():
+    selection = SelectionRules([{"action": "exclude", "file_type": "MP4", "topic": "test", "max_size_mb": 15}])
+
+    assert selection.select({"topic": "test"}, [SHARED, SHARED_PART_2, AUDIO])[0] == [SHARED_PART_2, AUDIO]
+    assert selection.select({"topic": "sync"}, [SHARED, SHARED_PART_2, AUDIO])[0] == [SHARED, SHARED_PART_2, AUDIO]
+
+
+def test_from_config_uses_rules_and_default():
+    selection = SelectionRules.from_config({"default": "exclude", "rules": [{"file_type": "CHAT"}], "dry_run": True})
+
+    assert selection.select({}, [SHARED, CHAT]) == ([CHAT], [SHARED])
+
+
+@pytest.mark.parametrize("rules, default, message", [
+    ([{"file_typ": "MP4"}], "include", "unknown rule keys file_typ"),
+    ([{"action": "skip"}], "include", "unknown rule action 'skip'"),
+    ([{"action": "exclude", "prefer": ["active_speaker"]}], "include", "prefer only applies to include rules"),
+    ([{"topic": "("}], "include", "invalid topic pattern"),
+    ([], "skip", "unknown default action 'skip'"),
+])
+def test_invalid_rules_are_refused(rules, default, message):
+    with pytest.raises(ValueError, match=message):
+        SelectionRules(rules, default)
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from rate_limiter import RateLimiter
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def rate(limiter, category):
+    return limiter.buckets[category][0]
+
+
+def test_429_halves_the_rate_down_to_the_minimum(clock):
+    limiter = RateLimiter(requests_per_second=8, min_requests_per_second=1.5)
+    limiter.acquire("users")
+
+    rates = []
+    for _ in range(4):
+        limiter.observe("users", Response(429))
+        rates.append(rate(limiter, "users"))
+
+    assert rates == [4, 2, 1.5, 1.5]
+
+
+def test_rate_recovers_slowly_up_to_the_maximum(clock):
+    limiter = RateLimiter(requests_per_second=8)
+    limiter.observe("users", Response(429))
+
+    for _ in range(10):
+        limiter.observe("users", Response(200))
+    assert rate(limiter, "users") == pytest.approx(5)
+
+    for _ in range(100):
+        limiter.observe("users", Response(200))
+    assert rate(limiter, "users") == 8
+
+
+def test_categories_are_limited_separately(clock):
+    limiter = RateLimiter(requests_per_second=8)
+    limiter.acquire("recordings")
+
+    limiter.observe("users", Response(429))
+
+    assert rate(limiter, "users") == 4
+    assert rate(limiter, "recordings") == 8
+
+
+def test_slows_down_close_to_the_limit(clock):
+    limiter = RateLimiter(requests_per_second=8)
+
+    limiter.observe("users", Response(200, {"X-RateLimit-Limit": "100", "X-RateLimit-Remaining": "5"}))
+
+    assert rate(limiter, "users") == 6
+
+
+def test_429_pauses_every_category_for_retry_after(clock):
+    limiter = RateLimiter(requests_per_second=100)
+    limiter.acquire("recordings")
+
+    limiter.observe("users", Response(429, {"Retry-After": "5"}))
+    limiter.acquire("recordings")
+
+    assert sum(clock.sleeps) == pytest.approx(5)
+
+
+def test_requests_are_spaced_at_the_rate(clock):
+    limiter = RateLimiter(requests_per_second=2)
+
+    for _ in range(5):
+        limiter.acquire("users")
+
+    # the first request is sent at once, every other one half a second after the last
+    assert sum(clock.sleeps) == pytest.approx(2)
+
+
+@pytest.mark.parametrize("headers, expected", [
+    pytest.param({"Retry-After": "3"}, 3, id="seconds"),
+    pytest.param({"Retry-After": format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)},
+                 30, id="http-date"),
+    pytest.param({"Retry-After": format_datetime(datetime(2000, 1, 1, tzinfo=timezone.utc), usegmt=True)},
+                 0, id="date-in-the-past"),
+    pytest.param({"Retry-After": "soon"}, None, id="unreadable"),
+    pytest.param({}, None, id="missing"),
+])
+def test_retry_after(headers, expected):
+    retry_after = RateLimiter.retry_after(Response(429, headers))
+
+    if expected is None:
+        assert retry_after is None
+    else:
+        assert retry_after == pytest.approx(expected, abs=2)
+
+
+def test_backoff_grows_up_to_the_maximum():
+    limiter = RateLimiter(retry_delay=1, max_retry_delay=8)
+
+    for attempt in range(10):
+        assert 0 <= limiter.backoff(attempt) <= min(8, 2 ** attempt)
@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+from sharding import HashShard, LeaseStore, shard_for
+
+LEASE_SECONDS = 0.3
+
+
+@pytest.fixture
+def lease_db(tmp_path):
+    return str(tmp_path / "leases.db")
+
+
+def store(lease_db, node_id, run_id="run-1", lease_seconds=LEASE_SECONDS):
+    return LeaseStore(lease_db, run_id, node_id, lease_seconds, log=lambda message: None)
+
+
+def test_only_one_node_claims_a_job(lease_db):
+    first, second = store(lease_db, "node-a"), store(lease_db, "node-b")
+
+    assert first.claim("user-1")
+    assert not second.claim("user-1")
+    assert second.claim("user-2")
+    assert not first.claim("user-2")
+
+
+def test_claim_again_by_the_same_node(lease_db):
+    node = store(lease_db, "node-a")
+
+    assert node.claim("user-1")
+    assert node.claim("user-1")
+
+
+def test_expired_lease_is_taken_over(lease_db):
+    dead, alive = store(lease_db, "node-a"), store(lease_db, "node-b")
+    messages = []
+    alive.log = messages.append
+
+    assert dead.claim("user-1")
+    time.sleep(LEASE_SECONDS * 1.5)
+
+    assert alive.claim("user-1")
+    assert messages == ["==> Taking over user-1 from node-a, whose lease expired"]
+    # the node that lost its lease cannot claim the job back while the new lease runs
+    assert not dead.claim("user-1")
+
+
+def test_renewed_lease_is_not_taken_over(lease_db):
+    working, waiting = store(lease_db, "node-a"), store(lease_db, "node-b")
+
+    assert working.claim("user-1")
+    working.start()
+    try:
+        time.sleep(LEASE_SECONDS * 2)
+        assert not waiting.claim("user-1")
+    finally:
+        working.stop()
+
+
+def test_finished_job_is_never_claimed_again(lease_db):
+    first, second = store(lease_db, "node-a"), store(lease_db, "node-b")
+
+    assert first.claim("user-1")
+    first.finish("user-1", True)
+    time.sleep(LEASE_SECONDS * 1.5)
+
+    assert not second.claim("user-1")
+    assert not first.claim("user-1")
+    assert second.unfinished(["user-1", "user-2"]) == ["user-2"]
+
+
+def test_failed_job_is_released_for_any_node(lease_db):
+    first, second = store(lease_db, "node-a"), store(lease_db, "node-b")
+
+    assert first.claim("user-1")
+    first.finish("user-1", False)
+
+    # no need to wait for the lease to run out
+    assert second.claim("user-1")
+    assert second.unfinished(["user-1"]) == ["user-1"]
+
+
+def test_finish_of_a_lost_lease_changes_nothing(lease_db):
+    dead, alive = store(lease_db, "node-a"), store(lease_db, "node-b")
+
+    assert dead.claim("user-1")
+    time.sleep(LEASE_SECONDS * 1.5)
+    assert alive.claim("user-1")
+
+    dead.finish("user-1", False)
+    dead.finish("user-1", True)
+    assert not store(lease_db, "node-c").claim("user-1")
+    assert alive.unfinished(["user-1"]) == ["user-1"]
+
+
+def test_runs_are_leased_separately(lease_db):
+    assert store(lease_db, "node-a", run_id="run-1").claim("user-1")
+    assert store(lease_db, "node-b", run_id="run-2").claim("user-1")
+
+
+@pytest.mark.parametrize("count", [1, 2, 5])
+def test_hash_shards_split_every_key_once(count):
+    shards = [HashShard(index, count) for index in range(count)]
+    keys = [f"user-{number}" for number in range(200)]
+
+    for key in keys:
+        assert [shard.claim(key) for shard in shards].count(True) == 1
+        assert shards[shard_for(key, count)].claim(key)
+
+
+def test_hash_shard_index_must_be_in_range():
+    with pytest.raises(ValueError):
+        HashShard(3, 3)
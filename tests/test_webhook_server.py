@@ -0,0 +1,115 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+
+import pytest
+
+from webhook_server import WebhookServer, post_event, sign
+
+SECRET = "secret-token"
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "webhook-sample.json")
+
+
+@pytest.fixture
+def sample_body():
+    with open(SAMPLE, "rb") as fd:
+        return fd.read()
+
+
+@pytest.fixture
+def server():
+    events = []
+    server = WebhookServer(SECRET, lambda event, payload: events.append((event, payload)), host="127.0.0.1", port=0)
+    server.events = events
+    yield server
+    server.httpd.server_close()
+
+
+def signed_headers(body, timestamp=None, secret=SECRET):
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    return {
+        "x-zm-request-timestamp": timestamp,
+        "x-zm-signature": "v0=" + sign(secret, f"v0:{timestamp}:{body.decode('utf-8')}")
+    }
+
+
+def test_sign_matches_zoom_hmac():
+    expected = hmac.new(SECRET.encode(), b"v0:1:{}", hashlib.sha256).hexdigest()
+    assert sign(SECRET, "v0:1:{}") == expected
+
+
+def test_valid_signature_passes_event_on(server, sample_body):
+    status, response = server.handle(signed_headers(sample_body), sample_body)
+
+    assert (status, response) == (200, {})
+    assert server.events == [("recording.completed", json.loads(sample_body)["payload"])]
+
+
+@pytest.mark.parametrize("headers", [
+    pytest.param(lambda body: signed_headers(body, secret="other-secret"), id="wrong secret"),
+    pytest.param(lambda body: signed_headers(body + b" "), id="signature of another body"),
+    pytest.param(lambda body: {**signed_headers(body), "x-zm-signature": ""}, id="no signature"),
+    pytest.param(lambda body: {"x-zm-signature": signed_headers(body)["x-zm-signature"]}, id="no timestamp"),
+    pytest.param(lambda body: {**signed_headers(body), "x-zm-request-timestamp": "soon"}, id="bad timestamp"),
+])
+def test_bad_signature_is_refused(server, sample_body, headers):
+    assert server.handle(headers(sample_body), sample_body) == (401, {"message": "invalid signature"})
+    assert server.events == []
+
+
+@pytest.mark.parametrize("skew", [-301, 301])
+def test_stale_timestamp_is_refused(server, sample_body, skew):
+    headers = signed_headers(sample_body, timestamp=int(time.time()) + skew)
+
+    assert server.handle(headers, sample_body) == (401, {"message": "invalid signature"})
+    assert server.events == []
+
+
+def test_timestamp_within_skew_is_accepted(server, sample_body):
+    headers = signed_headers(sample_body, timestamp=int(time.time()) - 250)
+
+    assert server.handle(headers, sample_body)[0] == 200
+
+
+def test_url_validation_is_answered(server):
+    body = json.dumps({"event": "endpoint.url_validation", "payload": {"plainToken": "qgg8vlvZRS6UYooatFL8Aw"}}).encode()
+
+    status, response = server.handle(signed_headers(body), body)
+
+    assert status == 200
+    assert response == {
+        "plainToken": "qgg8vlvZRS6UYooatFL8Aw",
+        "encryptedToken": hmac.new(SECRET.encode(), b"qgg8vlvZRS6UYooatFL8Aw", hashlib.sha256).hexdigest()
+    }
+    assert server.events == []
+
+
+def test_signed_invalid_json_is_a_bad_request(server):
+    body = b"not json"
+
+    assert server.handle(signed_headers(body), body) == (400, {"message": "invalid payload"})
+
+
+def test_failing_handler_asks_zoom_to_retry(sample_body):
+    def on_event(event, payload):
+        raise RuntimeError("queue is closed")
+
+    server = WebhookServer(SECRET, on_event, host="127.0.0.1", port=0, log=lambda message: None)
+    try:
+        assert server.handle(signed_headers(sample_body), sample_body)[0] == 500
+    finally:
+        server.httpd.server_close()
+
+
+def test_http_endpoint(server, sample_body):
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.httpd.server_address[1]}/"
+        assert post_event(url, SECRET, sample_body)[0] == 200
+        assert post_event(url, "other-secret", sample_body)[0] == 401
+        assert post_event(url + "other", SECRET, sample_body)[0] == 404
+    finally:
+        server.httpd.shutdown()
+    assert [event for event, _ in server.events] == ["recording.completed"]
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from zoom_auth import TokenManager
+
+WORKERS = 20
+
+
+class OAuth:
+    """Hands out token-1, token-2, ... and counts how often it was asked."""
+
+    def __init__(self, expires_in=3600, delay=0.05):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def fetch(self):
+        with self.lock:
+            self.calls += 1
+            number = self.calls
+        # slow enough for the other workers to ask while it runs
+        time.sleep(self.delay)
+        return f"token-{number}", self.expires_in
+
+
+def run_workers(target):
+    results = []
+    start = threading.Barrier(WORKERS)
+
+    def worker():
+        start.wait()
+        results.append(target())
+
+    threads = [threading.Thread(target=worker) for _ in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_token_is_fetched_exactly_once_by_many_workers():
+    oauth = OAuth()
+    manager = TokenManager(oauth.fetch)
+
+    tokens = run_workers(manager.get)
+
+    assert oauth.calls == 1
+    assert tokens == ["token-1"] * WORKERS
+
+
+def test_refused_token_is_replaced_exactly_once_by_many_workers():
+    oauth = OAuth()
+    manager = TokenManager(oauth.fetch)
+    refused = manager.get()
+
+    tokens = run_workers(lambda: manager.invalidate(refused))
+
+    assert oauth.calls == 2
+    assert tokens == ["token-2"] * WORKERS
+
+
+def test_invalidating_an_old_token_keeps_the_current_one():
+    oauth = OAuth(delay=0)
+    manager = TokenManager(oauth.fetch)
+    old = manager.get()
+    manager.invalidate(old)
+
+    assert manager.invalidate(old) == "token-2"
+    assert oauth.calls == 2
+
+
+@pytest.mark.parametrize("expires_in, refreshed_after", [
+    pytest.param(3600, 3300, id="before-the-margin"),
+    pytest.param(400, 200, id="short-lived-halfway"),
+])
+def test_token_is_refreshed_before_it_expires(clock, expires_in, refreshed_after):
+    oauth = OAuth(expires_in=expires_in, delay=0)
+    manager = TokenManager(oauth.fetch, refresh_margin=300)
+    manager.get()
+
+    clock.now += refreshed_after - 1
+    assert manager.get() == "token-1"
+    clock.now += 1
+    assert manager.get() == "token-2"
+
+
+def test_failed_background_refresh_is_logged_and_retried():
+    fetched = threading.Event()
+    attempts = []
+
+    def fetch():
+        attempts.append(None)
+        if len(attempts) == 2:
+            raise ConnectionError("oauth is down")
+        if len(attempts) == 3:
+            fetched.set()
+        # refreshed again at once, halfway through its lifetime
+        return f"token-{len(attempts)}", 0
+
+    messages = []
+    manager = TokenManager(fetch, retry_delay=0.01, log=messages.append)
+    manager.start()
+    try:
+        assert fetched.wait(5)
+    finally:
+        manager.stop()
+    assert messages[0].startswith("### Could not refresh the Zoom access token (oauth is down)")
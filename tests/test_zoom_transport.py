@@ -0,0 +1,145 @@
+import pytest
+import requests
+
+from rate_limiter import RateLimiter
+from zoom_auth import TokenManager
+from zoom_transport import ZoomTransport
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Zoom:
+    """Answers the requests of a transport with the given responses, or raises the given errors."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.tokens = []
+
+    def send(self, method, url, stream, kwargs):
+        authorization = (kwargs.get("headers") or {}).get("Authorization")
+        self.tokens.append(authorization and authorization.removeprefix("Bearer "))
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def transport(zoom, max_retries=3, tokens=("token-1", "token-2", "token-3")):
+    tokens = iter(tokens)
+    transport = ZoomTransport(
+        RateLimiter(requests_per_second=1000, retry_delay=1, max_retry_delay=8),
+        max_retries=max_retries,
+        log=lambda message: None,
+        token_manager=TokenManager(lambda: (next(tokens), 3600))
+    )
+    transport._send = zoom.send
+    return transport
+
+
+def test_429_waits_for_retry_after(clock):
+    refused = Response(429, {"Retry-After": "7"})
+    zoom = Zoom(refused, Response(200))
+
+    response = transport(zoom).request("GET", "https://zoom.test/users", "users")
+
+    assert response.status_code == 200
+    assert refused.closed
+    assert 7 in clock.sleeps
+    assert len(zoom.tokens) == 2
+
+
+def test_429_halves_the_rate_of_its_category(clock):
+    zoom = Zoom(Response(429), Response(200))
+    zoom_transport = transport(zoom)
+
+    zoom_transport.request("GET", "https://zoom.test/users", "users")
+
+    # halved by the 429, then recovering by a step with the 200
+    assert zoom_transport.rate_limiter.buckets["users"][0] == pytest.approx(500.1)
+
+
+def test_5xx_is_retried_with_backoff(clock):
+    zoom = Zoom(Response(503), Response(502), Response(200))
+
+    response = transport(zoom).request("GET", "https://zoom.test/users", "users")
+
+    assert response.status_code == 200
+    assert len(zoom.tokens) == 3
+    assert all(0 <= delay <= 2 for delay in clock.sleeps)
+
+
+def test_last_response_is_returned_after_the_retry_limit(clock):
+    zoom = Zoom(*[Response(503) for _ in range(3)])
+
+    response = transport(zoom, max_retries=2).request("GET", "https://zoom.test/users", "users")
+
+    assert response.status_code == 503
+    assert not zoom.answers
+
+
+def test_connection_error_is_raised_after_the_retry_limit(clock):
+    zoom = Zoom(*[requests.exceptions.ConnectionError("reset") for _ in range(3)])
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        transport(zoom, max_retries=2).request("GET", "https://zoom.test/users", "users")
+    assert not zoom.answers
+
+
+def test_other_errors_are_not_retried(clock):
+    zoom = Zoom(ValueError("bad url"), Response(200))
+
+    with pytest.raises(ValueError):
+        transport(zoom).request("GET", "https://zoom.test/users", "users")
+    assert len(zoom.answers) == 1
+
+
+def test_4xx_is_not_retried(clock):
+    zoom = Zoom(Response(404), Response(200))
+
+    assert transport(zoom).request("GET", "https://zoom.test/users", "users").status_code == 404
+    assert len(zoom.answers) == 1
+
+
+def test_401_is_retried_once_with_a_new_token(clock):
+    refused = Response(401)
+    zoom = Zoom(refused, Response(200))
+
+    response = transport(zoom).request("GET", "https://zoom.test/users", "users")
+
+    assert response.status_code == 200
+    assert refused.closed
+    assert zoom.tokens == ["token-1", "token-2"]
+
+
+def test_second_401_is_returned(clock):
+    zoom = Zoom(Response(401), Response(401), Response(200))
+
+    response = transport(zoom).request("GET", "https://zoom.test/users", "users")
+
+    assert response.status_code == 401
+    assert zoom.tokens == ["token-1", "token-2"]
+
+
+def test_401_without_authorization_is_returned(clock):
+    zoom = Zoom(Response(401), Response(200))
+
+    response = transport(zoom).request("GET", "https://cdn.test/file", "download", auth=False)
+
+    assert response.status_code == 401
+    assert zoom.tokens == [None]
+
+
+def test_stop_event_ends_the_retries(clock):
+    zoom = Zoom(Response(503), Response(200))
+    zoom_transport = transport(zoom)
+    zoom_transport.stop_event.set()
+
+    assert zoom_transport.request("GET", "https://zoom.test/users", "users").status_code == 503
@@ -0,0 +1,131 @@
+import hashlib
+import hmac
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def sign(secret_token, message):
+    """HMAC SHA-256 of message with the webhook secret token, as Zoom computes it."""
+    return hmac.new(secret_token.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class WebhookServer:
+    """HTTP endpoint for Zoom webhook events.
+
+    Every request must carry a valid x-zm-signature for its body and a recent
+    x-zm-request-timestamp. Zoom's endpoint.url_validation challenge is answered
+    here, every other event is passed to on_event(event, payload), which should
+    only queue work so that Zoom gets its answer within a few seconds.
+    """
+
+    MAX_BODY_SIZE = 1024 * 1024
+
+    def __init__(self, secret_token, on_event, host="0.0.0.0", port=8080, path="/", max_skew=300, log=print):
+        self.secret_token = secret_token
+        self.on_event = on_event
+        self.path = path
+        self.max_skew = max_skew
+        self.log = log
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    def verify(self, headers, body):
+        """True if the signature headers match the raw request body."""
+        timestamp = headers.get("x-zm-request-timestamp", "")
+        signature = headers.get("x-zm-signature", "")
+        if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > self.max_skew:
+            return False
+        expected = "v0=" + sign(self.secret_token, f"v0:{timestamp}:{body.decode('utf-8', 'replace')}")
+        return hmac.compare_digest(expected, signature)
+
+    def handle(self, headers, body):
+        """Process one webhook request, returns (HTTP status, response object)."""
+        if not self.verify(headers, body):
+            return 401, {"message": "invalid signature"}
+
+        try:
+            message = json.loads(body)
+            event = message["event"]
+            payload = message.get("payload", {})
+        except (ValueError, KeyError, TypeError):
+            return 400, {"message": "invalid payload"}
+
+        if event == "endpoint.url_validation":
+            plain_token = payload.get("plainToken", "")
+            return 200, {"plainToken": plain_token, "encryptedToken": sign(self.secret_token, plain_token)}
+
+        try:
+            self.on_event(event, payload)
+        except Exception as e:
+            # a failed answer makes Zoom deliver the event again later
+            self.log(f"### Could not handle the {event} webhook: {e}")
+            return 500, {"message": "could not handle event"}
+        return 200, {}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, response):
+                data = json.dumps(response).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.path.split("?")[0] != server.path:
+                    self._reply(404, {"message": "not found"})
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > server.MAX_BODY_SIZE:
+                    self._reply(413, {"message": "payload too large"})
+                    return
+                headers = {key.lower(): value for key, value in self.headers.items()}
+                self._reply(*server.handle(headers, self.rfile.read(length)))
+
+        return Handler
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def post_event(url, secret_token, body):
+    """Send a signed webhook body to url like Zoom does, returns (HTTP status, response text)."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    timestamp = str(int(time.time()))
+    request = urllib.request.Request(url, data=body, method="POST", headers={
+        "Content-Type": "application/json",
+        "x-zm-request-timestamp": timestamp,
+        "x-zm-signature": "v0=" + sign(secret_token, f"v0:{timestamp}:{body.decode('utf-8')}")
+    })
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+if __name__ == "__main__":
+    # post a sample payload to a running listener: webhook_server.py <url> <secret token> <payload.json>
+    if len(sys.argv) != 4:
+        sys.exit(f"usage: {sys.argv[0]} <url> <secret token> <payload.json>")
+    with open(sys.argv[3], "rb") as fd:
+        print(*post_event(sys.argv[1], sys.argv[2], fd.read()))
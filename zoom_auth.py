@@ -0,0 +1,68 @@
+import threading
+import time
+
+
+class TokenManager:
+    """Zoom server-to-server OAuth access token shared by every worker thread.
+
+    A background thread fetches a new token shortly before the current one
+    expires, and a request refused with 401 asks for one on demand. The lock
+    makes sure only one refresh runs at a time; threads that wanted a new token
+    while it ran reuse its result instead of fetching their own.
+    """
+
+    def __init__(self, fetch_token, refresh_margin=300, retry_delay=30, log=print):
+        # fetch_token() returns (access token, lifetime in seconds)
+        self.fetch_token = fetch_token
+        self.refresh_margin = float(refresh_margin)
+        self.retry_delay = float(retry_delay)
+        self.log = log
+        self.lock = threading.Lock()
+        self.token = None
+        self.refresh_at = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _refresh(self):
+        token, expires_in = self.fetch_token()
+        expires_in = float(expires_in)
+        self.token = token
+        # short lived tokens are refreshed halfway through instead
+        self.refresh_at = time.monotonic() + max(expires_in - self.refresh_margin, expires_in / 2)
+
+    def get(self):
+        """Return a token that is not about to expire, refreshing it first if needed."""
+        with self.lock:
+            if self.token is None or time.monotonic() >= self.refresh_at:
+                self._refresh()
+            return self.token
+
+    def invalidate(self, token):
+        """Refresh after Zoom refused token, unless another thread already replaced it."""
+        with self.lock:
+            if token == self.token:
+                self._refresh()
+            return self.token
+
+    def start(self):
+        """Fetch the first token and keep it fresh in a background thread."""
+        self.get()
+        self.thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self.thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            with self.lock:
+                wait = self.refresh_at - time.monotonic()
+            if self.stop_event.wait(max(wait, 0)):
+                return
+            try:
+                self.get()
+            except Exception as e:
+                # workers keep using the current token, and refresh on demand if it runs out
+                self.log(f"### Could not refresh the Zoom access token ({e}), retrying in {self.retry_delay:.0f} seconds")
+                if self.stop_event.wait(self.retry_delay):
+                    return
+
+    def stop(self):
+        self.stop_event.set()
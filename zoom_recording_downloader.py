@@ -0,0 +1,1996 @@
+#!/usr/bin/env python3
+
+# Program Name: zoom_recording_downloader.py
+# Description:  Zoom Recording Downloader is a cross-platform Python script
+#               that uses Zoom's API (v2) to download and organize all
+#               cloud recordings from a Zoom account onto local storage.
+#               This Python script uses the OAuth method of accessing the Zoom API
+#               The command line is zoom-recording-downloader.py, other programs
+#               can import this module and call sync()
+# Created:      2020-04-26
+# Author:       Ricardo Rodrigues
+# Website:      https://github.com/ricardorodrigues-ca/zoom-recording-downloader
+# Forked from:  https://gist.github.com/danaspiegel/c33004e52ffacb60c24215abf8301680
+
+# System modules
+import argparse
+import base64
+import collections
+import ctypes
+import hashlib
+import json
+import os
+import queue
+import re as regex
+import shutil
+import signal
+import sys as system
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timezone, timedelta
+
+# Installed modules
+import dateutil.parser as parser
+import pathvalidate as path_validate
+from zoneinfo import ZoneInfo
+import state_store
+from bandwidth import BandwidthLimiter
+from file_selection import SelectionRules
+from metrics import Metrics
+from rate_limiter import RateLimiter
+from sharding import HashShard, LeaseStore, default_node_id
+from state_store import StateStore
+from webhook_server import WebhookServer
+from zoom_auth import TokenManager
+from zoom_transport import ZoomTransport
+
+# google_drive_client, s3_storage and tqdm take most of the start up time, so they
+# are only imported once a run uploads to them or shows a progress bar
+
+class Color:
+    PURPLE = "\033[95m"
+    CYAN = "\033[96m"
+    DARK_CYAN = "\033[36m"
+    BLUE = "\033[94m"
+    GREEN = "\033[92m"
+    YELLOW = "\033[93m"
+    RED = "\033[91m"
+    BOLD = "\033[1m"
+    UNDERLINE = "\033[4m"
+    END = "\033[0m"
+
+COLOR_CODES = {name: code for name, code in vars(Color).items() if name.isupper()}
+
+APP_VERSION = "3.1 (Google Drive Edition)"
+
+CONF_PATH = "zoom-recording-downloader.conf"
+CONF = {}
+
+
+class SyncError(Exception):
+    """ A run cannot start or go on, e.g. because a setting is missing or Zoom refused the credentials
+    """
+
+
+def load_config(path=CONF_PATH):
+    """ Load a configuration file and check for proper JSON syntax
+    """
+    try:
+        with open(path, encoding="utf-8-sig") as json_file:
+            return json.loads(json_file.read())
+    except json.JSONDecodeError as e:
+        raise SyncError(f"Error parsing JSON in {path}: {e}")
+    except FileNotFoundError:
+        raise SyncError(f"Configuration file {path} not found")
+    except OSError as e:
+        raise SyncError(f"Could not read {path}: {e}")
+
+def config(section, key, default=''):
+    try:
+        return CONF[section][key]
+    except KeyError:
+        if default == LookupError:
+            raise SyncError(f"No value provided for {section}:{key} in the configuration")
+        else:
+            return default
+
+
+def set_colors(color_class):
+    """ Blank the color codes of color_class in log mode, restore them otherwise
+    """
+    for name, code in COLOR_CODES.items():
+        setattr(color_class, name, "" if LOG_MODE else code)
+
+
+# the tqdm module once a progress bar was opened, lines are printed through it from then on
+_tqdm = None
+
+
+# without a progress bar, lines of the worker threads are written whole under this lock
+_LOG_LOCK = threading.Lock()
+
+
+def log(message):
+    """ Print a line above the progress bar, if there is one
+    """
+    if _tqdm:
+        _tqdm.tqdm.write(message)
+        return
+    with _LOG_LOCK:
+        system.stdout.write(message + "\n")
+        system.stdout.flush()
+
+
+def format_size(num, suffix="B"):
+    """ A size or rate in 1024 based units, as the progress bar shows them, e.g. 1.50GB
+    """
+    for unit in ("", "k", "M", "G", "T"):
+        if abs(num) < 999.5:
+            break
+        num /= 1024
+    precision = 2 if abs(num) < 9.995 else 1 if abs(num) < 99.95 else 0
+    return f"{num:.{precision}f}{unit}{suffix}"
+
+
+def format_interval(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class NullProgressBar:
+    """ Stands in for the tqdm progress bar in log mode, without importing tqdm
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def get_lock(self):
+        return self.lock
+
+    def refresh(self):
+        pass
+
+    def update(self, size):
+        pass
+
+    def close(self):
+        pass
+
+
+def open_progress_bar():
+    """ The shared download progress bar, tqdm is imported the first time one is shown
+    """
+    global _tqdm
+    if LOG_MODE:
+        return NullProgressBar()
+    import tqdm
+    _tqdm = tqdm
+    return tqdm.tqdm(dynamic_ncols=True, total=0, unit="iB", unit_scale=True)
+
+
+def configure(conf):
+    """ Read the settings of a run from conf, a dict in the layout of the configuration
+        file, and set up the clients and locks the workers share. Nothing is read at
+        import time, so the module can be imported without a configuration file.
+        Raises SyncError for a missing or invalid setting
+    """
+    try:
+        read_settings(conf)
+    except SyncError:
+        raise
+    except (TypeError, ValueError, LookupError, AttributeError) as e:
+        # e.g. a number that is not one, an unknown timezone or a date that is not a string
+        raise SyncError(f"Invalid configuration: {e}")
+
+
+def read_settings(conf):
+    """ The settings and shared clients of configure()
+    """
+    global CONF, ACCOUNT_ID, CLIENT_ID, CLIENT_SECRET, API_ENDPOINT, API_ENDPOINT_OAUTH, API_ENDPOINT_USER_LIST
+    global RECORDING_START_DATE, RECORDING_END_DATE, DOWNLOAD_DIRECTORY, COMPLETED_MEETING_IDS_LOG, STATE_DB
+    global STATE_STORE, MAX_CONCURRENT_DOWNLOADS, SEGMENT_THRESHOLD, SEGMENTS_PER_FILE, DOWNLOAD_MAX_RETRIES
+    global DOWNLOAD_RETRY_DELAY, DOWNLOAD_CHUNK_SIZE, FSYNC_POLICY, FSYNC_INTERVAL, PROGRESS_INTERVAL
+    global DOWNLOAD_SCHEDULE, DISK_BUDGET, MIN_FREE_DISK, DOWNLOAD_BANDWIDTH, UPLOAD_BANDWIDTH
+    global SHUTDOWN_REQUESTED, DOWNLOAD_DIR_LOCK, MEETING_TIMEZONE, MEETING_STRFTIME, MEETING_FILENAME
+    global MEETING_FOLDER, RECORDING_PREFETCH_WINDOWS, MAX_CONCURRENT_LISTING, RECORDING_INCREMENTAL
+    global RECORDING_INCREMENTAL_OVERLAP, RECORDING_FULL_RESCAN, SYNC_STATE_FILE, LISTING_EXECUTOR, SELECTION
+    global DRY_RUN
+    global INCOMPLETE_LISTINGS, INCOMPLETE_LISTINGS_LOCK, WEBHOOK_SECRET_TOKEN, WEBHOOK_HOST, WEBHOOK_PORT
+    global WEBHOOK_PATH, WEBHOOK_MAX_SKEW, WEBHOOK_RECONCILE_INTERVAL, SHARD_MODE, SHARD_UNIT, SHARD_INDEX
+    global SHARD_COUNT, SHARD_LEASE_DB, SHARD_LEASE_SECONDS, SHARD_NODE_ID, SHARD_RUN_ID, SHARD_LEASE_AHEAD
+    global SHARD, METRICS, METRICS_REPORT_FILE, METRICS_TEXTFILE, METRICS_HOST, METRICS_PORT, LOG_MODE
+    global GDRIVE_CREDENTIALS_FILE, GDRIVE_ROOT_FOLDER, GDRIVE_RETRY_DELAY, GDRIVE_MAX_RETRIES
+    global GDRIVE_FAILED_LOG
+    global STORAGE_METHOD, INTERACTIVE, ZOOM_MAX_RETRIES, RATE_LIMITER, ZOOM, TOKEN_MANAGER
+
+    CONF = conf
+
+    ACCOUNT_ID = config("OAuth", "account_id", LookupError)
+    CLIENT_ID = config("OAuth", "client_id", LookupError)
+    CLIENT_SECRET = config("OAuth", "client_secret", LookupError)
+
+    # overridden to point at stand-in servers, e.g. the benchmark's
+    API_ENDPOINT = config("Network", "api_url", "https://api.zoom.us/v2").rstrip("/")
+    API_ENDPOINT_OAUTH = config("Network", "oauth_url", "https://zoom.us/oauth/token")
+    API_ENDPOINT_USER_LIST = f"{API_ENDPOINT}/users"
+
+    RECORDING_START_YEAR = config("Recordings", "start_year", date.today().year)
+    RECORDING_START_MONTH = config("Recordings", "start_month", 1)
+    RECORDING_START_DAY = config("Recordings", "start_day", 1)
+    RECORDING_START_DATE = parser.parse(config("Recordings", "start_date", f"{RECORDING_START_YEAR}-{RECORDING_START_MONTH}-{RECORDING_START_DAY}")).replace(tzinfo=timezone.utc)
+    RECORDING_END_DATE = parser.parse(config("Recordings", "end_date", str(date.today()))).replace(tzinfo=timezone.utc)
+    DOWNLOAD_DIRECTORY = config("Storage", "download_dir", 'downloads')
+    # the completed log is only read once, to import it into the state database
+    COMPLETED_MEETING_IDS_LOG = config("Storage", "completed_log", 'completed-downloads.log')
+    STATE_DB = config("Storage", "state_db", 'zoom-recording-downloader.db')
+    STATE_STORE = None
+    MAX_CONCURRENT_DOWNLOADS = max(1, int(config("Storage", "max_concurrent_downloads", 4)))
+    SEGMENT_THRESHOLD = int(config("Storage", "segment_threshold_mb", 256)) * 1024 * 1024
+    SEGMENTS_PER_FILE = max(1, int(config("Storage", "segments_per_file", 4)))
+    DOWNLOAD_MAX_RETRIES = int(config("Storage", "max_retries", 3))
+    DOWNLOAD_RETRY_DELAY = int(config("Storage", "retry_delay", 5))
+    # bytes read from Zoom and written to disk at a time
+    DOWNLOAD_CHUNK_SIZE = max(32 * 1024, int(float(config("Storage", "chunk_size_mb", 1)) * 1024 * 1024))
+    # fsync downloads never, once when complete, or every fsync_interval_mb as well ("periodic")
+    FSYNC_POLICY = config("Storage", "fsync", "never")
+    if FSYNC_POLICY not in ("never", "complete", "periodic"):
+        raise SyncError(f"Unknown Storage fsync policy '{FSYNC_POLICY}'")
+    FSYNC_INTERVAL = int(config("Storage", "fsync_interval_mb", 64)) * 1024 * 1024
+    # the shared progress bar is updated at most this often per file, in seconds
+    PROGRESS_INTERVAL = float(config("Storage", "progress_interval", 0.5))
+    # order in which files are downloaded: listing (as soon as they are listed), largest_first or smallest_first
+    DOWNLOAD_SCHEDULE = config("Storage", "schedule", "listing")
+    if DOWNLOAD_SCHEDULE not in ("listing", "largest_first", "smallest_first"):
+        raise SyncError(f"Unknown Storage schedule '{DOWNLOAD_SCHEDULE}'")
+    # bytes a run may keep in the download directory at once, 0 for no limit
+    DISK_BUDGET = int(config("Storage", "disk_budget_mb", 0)) * 1024 * 1024
+    MIN_FREE_DISK = int(config("Storage", "min_free_disk_mb", 0)) * 1024 * 1024
+
+    # download and upload bandwidth caps, shared by every worker
+    try:
+        DOWNLOAD_BANDWIDTH = BandwidthLimiter.from_config(CONF.get("Bandwidth", {}), "download")
+        UPLOAD_BANDWIDTH = BandwidthLimiter.from_config(CONF.get("Bandwidth", {}), "upload")
+    except KeyError as e:
+        raise SyncError(f"Invalid Bandwidth schedule: an entry has no {e}")
+    except (TypeError, ValueError, AttributeError) as e:
+        raise SyncError(f"Invalid Bandwidth schedule: {e}")
+
+    # set by handle_graceful_shutdown so that worker threads stop writing
+    SHUTDOWN_REQUESTED = threading.Event()
+    # held while creating or removing recording folders, which download and upload workers share
+    DOWNLOAD_DIR_LOCK = threading.Lock()
+
+    MEETING_TIMEZONE = ZoneInfo(config("Recordings", "timezone", 'UTC'))
+    MEETING_STRFTIME = config("Recordings", "strftime", '%Y.%m.%d - %I.%M %p UTC')
+    MEETING_FILENAME = config("Recordings", "filename", '{meeting_time} - {topic} - {rec_type} - {recording_id}.{file_extension}')
+    MEETING_FOLDER = config("Recordings", "folder", '{topic} - {meeting_time}')
+    RECORDING_PREFETCH_WINDOWS = max(0, int(config("Recordings", "prefetch_windows", 2)))
+    MAX_CONCURRENT_LISTING = max(1, int(config("Recordings", "max_concurrent_listing", 4)))
+
+    # incremental mode only lists recordings after the point each user was last fully synced
+    RECORDING_INCREMENTAL = bool(config("Recordings", "incremental", False))
+    RECORDING_INCREMENTAL_OVERLAP = timedelta(days=float(config("Recordings", "incremental_overlap_days", 2)))
+    RECORDING_FULL_RESCAN = bool(config("Recordings", "full_rescan", False))
+    SYNC_STATE_FILE = config("Storage", "sync_state_file", "sync-state.json")
+
+    # rules choosing which files of a recording are downloaded, applied before any is queued
+    try:
+        SELECTION = SelectionRules.from_config(CONF.get("Selection", {}))
+    except (TypeError, ValueError) as e:
+        raise SyncError(f"Invalid Selection rules: {e}")
+    # list the recordings and apply the rules without downloading anything
+    DRY_RUN = bool(config("Selection", "dry_run", False))
+
+    # shared by the user page and recording window requests to cap concurrent listing calls
+    LISTING_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LISTING)
+    # users with a recording window that could not be listed
+    INCOMPLETE_LISTINGS = set()
+    INCOMPLETE_LISTINGS_LOCK = threading.Lock()
+
+    # server mode, started with --serve, downloads recordings as Zoom webhooks announce them
+    WEBHOOK_SECRET_TOKEN = config("Webhook", "secret_token", "")
+    WEBHOOK_HOST = config("Webhook", "host", "0.0.0.0")
+    WEBHOOK_PORT = int(config("Webhook", "port", 8080))
+    WEBHOOK_PATH = config("Webhook", "path", "/")
+    WEBHOOK_MAX_SKEW = int(config("Webhook", "max_timestamp_skew", 300))
+    WEBHOOK_RECONCILE_INTERVAL = float(config("Webhook", "reconcile_interval_minutes", 60)) * 60
+
+    # sharded runs split the users or recordings between nodes, "hash" by consistent hashing
+    # of the shard index out of count, "lease" by leasing jobs from a database every node can reach
+    SHARD_MODE = config("Sharding", "mode", "")
+    SHARD_UNIT = config("Sharding", "unit", "user")
+    SHARD_INDEX, SHARD_COUNT = int(config("Sharding", "index", 0)), int(config("Sharding", "count", 1))
+    SHARD_LEASE_DB = config("Sharding", "lease_db", "leases.db")
+    SHARD_LEASE_SECONDS = float(config("Sharding", "lease_seconds", 600))
+    SHARD_NODE_ID = config("Sharding", "node_id", "") or default_node_id()
+    # nodes working on the same run must agree on it, and every new run needs a new one
+    SHARD_RUN_ID = str(config("Sharding", "run_id", ""))
+    SHARD_LEASE_AHEAD = int(config("Sharding", "lease_ahead_files", MAX_CONCURRENT_DOWNLOADS * 2))
+    SHARD = None
+
+    # counts, bytes and latencies of the run, exported as a JSON report and in the Prometheus format
+    METRICS = Metrics()
+    METRICS_REPORT_FILE = config("Metrics", "report_file", "")
+    METRICS_TEXTFILE = config("Metrics", "prometheus_textfile", "")
+    METRICS_HOST = config("Metrics", "host", "0.0.0.0")
+    METRICS_PORT = int(config("Metrics", "port", 0))
+
+    # plain output for cron jobs and log files: no screen clearing, logo, colors or progress bars
+    LOG_MODE = bool(config("Logging", "log_mode", False))
+    set_colors(Color)
+    if "storage_backend" in system.modules:
+        set_colors(system.modules["storage_backend"].Color)
+
+    # Google Drive configuration
+    GDRIVE_CREDENTIALS_FILE = config("GoogleDrive", "credentials_file", "service-account.json")
+    GDRIVE_ROOT_FOLDER = config("GoogleDrive", "root_folder_name", "zoom-recording-downloader")
+    GDRIVE_RETRY_DELAY = int(config("GoogleDrive", "retry_delay", "5"))
+    GDRIVE_MAX_RETRIES = int(config("GoogleDrive", "max_retries", "3"))
+    GDRIVE_FAILED_LOG = config("GoogleDrive", "failed_log", "failed-uploads.log")
+    # one of STORAGE_BACKENDS, the command line asks when it is not set, sync() stores locally
+    STORAGE_METHOD = config("Storage", "method", "")
+    if STORAGE_METHOD and STORAGE_METHOD not in STORAGE_BACKENDS:
+        raise SyncError(f"Unknown Storage method '{STORAGE_METHOD}', use one of {', '.join(STORAGE_BACKENDS)}")
+    # set once somebody answered the storage prompt, and can be asked again
+    INTERACTIVE = False
+
+    # Zoom rate limiting and connection pooling, shared by the listing and download workers
+    ZOOM_MAX_RETRIES = int(config("RateLimit", "max_retries", 5))
+    RATE_LIMITER = RateLimiter(
+        requests_per_second=float(config("RateLimit", "requests_per_second", 10)),
+        min_requests_per_second=float(config("RateLimit", "min_requests_per_second", 0.5)),
+        retry_delay=float(config("RateLimit", "retry_delay", 1)),
+        max_retry_delay=float(config("RateLimit", "max_retry_delay", 60))
+    )
+    ZOOM = ZoomTransport(
+        RATE_LIMITER,
+        # every download segment and listing call can hold a connection at the same time
+        pool_size=int(config(
+            "Network", "pool_size", MAX_CONCURRENT_DOWNLOADS * SEGMENTS_PER_FILE + MAX_CONCURRENT_LISTING
+        )),
+        connect_timeout=float(config("Network", "connect_timeout", 10)),
+        read_timeout=float(config("Network", "read_timeout", 60)),
+        http2=bool(config("Network", "http2", False)),
+        max_retries=ZOOM_MAX_RETRIES,
+        stop_event=SHUTDOWN_REQUESTED,
+        log=lambda message: log(f"{Color.YELLOW}{message}{Color.END}"),
+        metrics=METRICS
+    )
+
+    # one access token for every worker, refreshed before it expires
+    TOKEN_MANAGER = TokenManager(
+        fetch_access_token,
+        refresh_margin=float(config("OAuth", "token_refresh_margin", 300)),
+        log=lambda message: log(f"{Color.YELLOW}{message}{Color.END}")
+    )
+    ZOOM.token_manager = TOKEN_MANAGER
+
+
+def continue_with_local_storage():
+    """Ask whether to continue with local storage after the storage backend failed, raises SyncError if not"""
+    if not INTERACTIVE:
+        # nobody is there to answer an unattended run
+        raise SyncError(f"The {STORAGE_METHOD} storage could not be set up")
+    choice = input("Would you like to continue with local storage instead? (y/n): ")
+    if choice.lower() != 'y':
+        raise SyncError(f"The {STORAGE_METHOD} storage could not be set up")
+
+def setup_google_drive():
+    """Initialize Google Drive client with OAuth authentication"""
+    drive_config = CONF.get('GoogleDrive', {})
+    if SHARD_MODE and not drive_config.get('reuse_root_folder', False):
+        # a timestamped root folder per node would scatter the shards
+        print(f"{Color.YELLOW}### Sharded runs upload into a reused root folder{Color.END}")
+        drive_config = {**drive_config, 'reuse_root_folder': True}
+    try:
+        import google_drive_client
+        set_colors(google_drive_client.Color)
+        drive_client = google_drive_client.GoogleDriveClient(
+            drive_config, bandwidth=UPLOAD_BANDWIDTH, metrics=METRICS, log=log
+        )
+        if not drive_client.authenticate():
+            continue_with_local_storage()
+            return None
+            
+        if not drive_client.initialize_root_folder():
+            print(f"{Color.RED}### Failed to create root folder in Google Drive{Color.END}")
+            continue_with_local_storage()
+            return None
+            
+        return drive_client
+    except SyncError:
+        raise
+    except Exception as e:
+        print(f"{Color.RED}### Google Drive initialization failed: {str(e)}{Color.END}")
+        continue_with_local_storage()
+        return None
+
+def setup_s3():
+    """Initialize the S3 client and check that the bucket can be reached"""
+    try:
+        import s3_storage
+        set_colors(s3_storage.Color)
+        storage = s3_storage.S3Storage(CONF.get('S3', {}), bandwidth=UPLOAD_BANDWIDTH, metrics=METRICS, log=log)
+        if not storage.connect():
+            continue_with_local_storage()
+            return None
+
+        return storage
+    except SyncError:
+        raise
+    except Exception as e:
+        print(f"{Color.RED}### S3 initialization failed: {str(e)}{Color.END}")
+        continue_with_local_storage()
+        return None
+
+# storage method -> function that sets up its storage_backend.StorageBackend, or returns
+# None to keep the recordings in the download directory; other backends can be added here
+STORAGE_BACKENDS = {
+    "local": lambda: None,
+    "google_drive": setup_google_drive,
+    "s3": setup_s3,
+}
+
+
+def fetch_access_token():
+    """ OAuth function, thanks to https://github.com/freelimiter
+    """
+    url = f"{API_ENDPOINT_OAUTH}?grant_type=account_credentials&account_id={ACCOUNT_ID}"
+
+    client_cred = f"{CLIENT_ID}:{CLIENT_SECRET}"
+    client_cred_base64_string = base64.b64encode(client_cred.encode("utf-8")).decode("utf-8")
+
+    headers = {
+        "Authorization": f"Basic {client_cred_base64_string}",
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+
+    response = json.loads(ZOOM.request("POST", url, "oauth", auth=False, headers=headers).text)
+
+    try:
+        return response["access_token"], response.get("expires_in", 3600)
+    except KeyError:
+        raise Exception("The key 'access_token' wasn't found.")
+
+
+def load_access_token():
+    """ Fetch the first access token and keep refreshing it in the background
+    """
+    try:
+        TOKEN_MANAGER.start()
+    except Exception as e:
+        raise SyncError(f"Could not get a Zoom access token: {e}")
+
+
+def get_users_page(page_number):
+    response = ZOOM.request(
+        "GET",
+        API_ENDPOINT_USER_LIST,
+        "users",
+        params={"page_size": 300, "page_number": page_number}
+    )
+    return response
+
+
+def parse_users(user_data):
+    return [
+        (
+            user["email"],
+            user["id"],
+            user.get("first_name", ""),  # Use .get() with a default value
+            user.get("last_name", "")    # Use .get() with a default value
+        )
+        for user in user_data["users"]
+    ]
+
+
+def users_page_data(response, page_number):
+    """ The JSON of a page of users, SyncError if Zoom still refused it after the retries
+    """
+    if response.status_code >= 400:
+        raise SyncError(
+            f"Could not retrieve users page {page_number} (HTTP {response.status_code}). Please make sure "
+            f"that your access token is still valid"
+        )
+    return response.json()
+
+
+def get_users():
+    """ loop through pages and yield users as soon as each page arrives, the pages
+        after the first are fetched concurrently
+    """
+    page_data = users_page_data(get_users_page(1), 1)
+    yield from parse_users(page_data)
+
+    pages = [
+        (page, LISTING_EXECUTOR.submit(get_users_page, page))
+        for page in range(2, int(page_data["page_count"]) + 1)
+    ]
+    for page, response in pages:
+        yield from parse_users(users_page_data(response.result(), page))
+
+
+def format_filename(params):
+    file_extension = params["file_extension"].lower()
+    recording = params["recording"]
+    recording_id = params["recording_id"]
+    recording_type = params["recording_type"]
+
+    invalid_chars_pattern = r'[<>:"/\\|?*\x00-\x1F]'
+    topic = regex.sub(invalid_chars_pattern, '', recording["topic"])
+    rec_type = recording_type.replace("_", " ").title()
+    meeting_time_utc = parser.parse(recording["start_time"]).replace(tzinfo=timezone.utc)
+    meeting_time_local = meeting_time_utc.astimezone(MEETING_TIMEZONE)
+    year = meeting_time_local.strftime("%Y")
+    month = meeting_time_local.strftime("%m")
+    day = meeting_time_local.strftime("%d")
+    meeting_time = meeting_time_local.strftime(MEETING_STRFTIME)
+
+    filename = MEETING_FILENAME.format(**locals())
+    folder = MEETING_FOLDER.format(**locals())
+    return (filename, folder)
+
+
+def get_downloads(recording):
+    if not recording.get("recording_files"):
+        raise Exception
+
+    downloads = []
+    for download in recording["recording_files"]:
+        file_type = download["file_type"]
+        file_extension = download["file_extension"]
+        recording_id = download["id"]
+
+        if file_type == "":
+            recording_type = "incomplete"
+        elif file_type != "TIMELINE":
+            recording_type = download["recording_type"]
+        else:
+            recording_type = download["file_type"]
+
+        # the access token is added when the download starts, it may be refreshed by then
+        download_url = download["download_url"]
+        file_size = int(download.get("file_size") or 0)
+        downloads.append((file_type, file_extension, download_url, recording_type, recording_id, file_size))
+
+    return downloads
+
+
+def get_recordings(email, page_size, rec_start_date, rec_end_date):
+    return {
+        "userId": email,
+        "page_size": page_size,
+        "from": rec_start_date,
+        "to": rec_end_date
+    }
+
+
+def per_delta(start, end, delta):
+    """ Generator used to create deltas for recording start and end dates
+    """
+    curr = start
+    while curr < end:
+        yield curr, min(curr + delta, end)
+        curr += delta
+
+
+def list_recordings_window(email, start, end):
+    """ Get the recordings of a user within a single date window, following
+        next_page_token through every page
+    """
+    recordings = []
+    post_data = get_recordings(email, 300, start, end)
+    started = time.monotonic()
+
+    while True:
+        response = ZOOM.request(
+            "GET",
+            f"{API_ENDPOINT}/users/{email}/recordings",
+            "recordings",
+            params=post_data
+        )
+        recordings_data = response.json()
+        if "meetings" not in recordings_data:
+            log(
+                f"{Color.RED}### No 'meetings' key found in response for {email} from {start} to {end} "
+                f"(HTTP {response.status_code}){Color.END}"
+            )
+            with INCOMPLETE_LISTINGS_LOCK:
+                INCOMPLETE_LISTINGS.add(email)
+            METRICS.inc("listing_errors_total")
+            break
+
+        recordings.extend(recordings_data["meetings"])
+        METRICS.inc("listing_pages_total")
+        if not recordings_data.get("next_page_token"):
+            break
+        post_data["next_page_token"] = recordings_data["next_page_token"]
+
+    METRICS.observe("listing_window_seconds", time.monotonic() - started)
+    METRICS.inc("recordings_listed_total", len(recordings))
+    return recordings
+
+
+def list_recordings(email, start_date=None, end_date=None):
+    """ Yield the recordings of a user one 30 day window at a time, from start_date
+        to end_date (RECORDING_START_DATE and RECORDING_END_DATE by default), while up
+        to RECORDING_PREFETCH_WINDOWS later windows are fetched in the background
+    """
+    windows = per_delta(
+        start_date or RECORDING_START_DATE, end_date or RECORDING_END_DATE, timedelta(days=30)
+    )
+
+    pending = collections.deque()
+    for start, end in windows:
+        pending.append(LISTING_EXECUTOR.submit(list_recordings_window, email, start, end))
+        if len(pending) > RECORDING_PREFETCH_WINDOWS:
+            yield from pending.popleft().result()
+
+    while pending:
+        yield from pending.popleft().result()
+
+
+def split_ranges(total_size, segments):
+    """ Split total_size bytes into (start, end) inclusive byte ranges
+    """
+    segment_size = -(-total_size // segments)
+    return [
+        [start, min(start + segment_size, total_size) - 1]
+        for start in range(0, total_size, segment_size)
+    ]
+
+
+def content_range_total(response):
+    """ Total size from a 'Content-Range: bytes start-end/total' header, or None
+    """
+    total = response.headers.get("content-range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+class FileProgress:
+    """ Tracks how many bytes of a single file are counted in the shared progress bar,
+        so that retries and resumed downloads do not count the same bytes twice
+    """
+
+    def __init__(self, prog_bar):
+        self.prog_bar = prog_bar
+        self.total = None
+        self.counted = 0
+        self.unreported = 0  # counted but not yet shown, the bar is redrawn every PROGRESS_INTERVAL
+        self.reported_at = 0.0
+        self.lock = threading.Lock()
+
+    def set_total(self, total_size):
+        if self.total is not None:
+            return
+        self.total = total_size
+        with self.prog_bar.get_lock():
+            self.prog_bar.total += total_size
+            self.prog_bar.refresh()
+
+    def update(self, size):
+        with self.lock:
+            self.counted += size
+            self.unreported += size
+            now = time.monotonic()
+            if now - self.reported_at < PROGRESS_INTERVAL:
+                return
+            size, self.unreported, self.reported_at = self.unreported, 0, now
+        self.prog_bar.update(size)
+
+    def reset(self, size_on_disk):
+        self.update(size_on_disk - self.counted)
+
+    def flush(self):
+        with self.lock:
+            size, self.unreported = self.unreported, 0
+        if size:
+            self.prog_bar.update(size)
+
+
+try:
+    _fallocate = ctypes.CDLL(None, use_errno=True).fallocate
+    _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+except (AttributeError, OSError, TypeError):
+    _fallocate = None
+FALLOC_FL_KEEP_SIZE = 1
+
+
+def preallocate(fd, offset, length):
+    """ Reserve the disk blocks of the rest of a file without changing its size, where the
+        platform supports it, so a large download is laid out in one piece and a full disk
+        shows up at the start. The size has to stay unchanged for resuming to work
+    """
+    if _fallocate is not None and length > 0:
+        # failures, e.g. on file systems without fallocate, only lose the optimisation
+        _fallocate(fd.fileno(), FALLOC_FL_KEEP_SIZE, offset, length)
+
+
+class FileSync:
+    """ Applies the FSYNC_POLICY to a file being written
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.unsynced = 0
+
+    def _sync(self):
+        self.fd.flush()
+        os.fsync(self.fd.fileno())
+        self.unsynced = 0
+
+    def wrote(self, size):
+        if FSYNC_POLICY == "periodic":
+            self.unsynced += size
+            if self.unsynced >= FSYNC_INTERVAL:
+                self._sync()
+
+    def finish(self):
+        if FSYNC_POLICY != "never":
+            self._sync()
+
+
+def sync_directory(path):
+    """ Make a rename in path durable, when the fsync policy asks for it
+    """
+    if FSYNC_POLICY == "never" or os.name == "nt":
+        return
+    dir_fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def download_segment(url, part_filename, start, end, progress, auth):
+    """ Fetch bytes start-end of url and write them at the same offset of part_filename
+    """
+    response = ZOOM.request(
+        "GET", url, "download", auth=auth, headers={"Range": f"bytes={start}-{end}"}, stream=True
+    )
+    if response.status_code != 206:
+        raise Exception(f"expected partial content for range {start}-{end}, got {response.status_code}")
+
+    received = 0
+    bandwidth = DOWNLOAD_BANDWIDTH.stream()
+    with open(part_filename, "r+b") as fd:
+        fd.seek(start)
+        sync = FileSync(fd)
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            if SHUTDOWN_REQUESTED.is_set():
+                raise InterruptedError("shutdown requested")
+            bandwidth.throttle(len(chunk))
+            METRICS.inc("download_bytes_total", len(chunk))
+            progress.update(len(chunk))
+            fd.write(chunk)
+            sync.wrote(len(chunk))
+            received += len(chunk)
+        # on disk before the segment is recorded as done
+        sync.finish()
+
+    if received != end - start + 1:
+        raise Exception(f"range {start}-{end} ended after {received} bytes")
+
+
+def write_segment_state(segments_filename, state):
+    """ Replace the segment state file in one step, so a crash never leaves half of it
+    """
+    with open(f"{segments_filename}.tmp", "w") as fd:
+        json.dump(state, fd)
+    os.replace(f"{segments_filename}.tmp", segments_filename)
+
+
+def download_segmented(url, part_filename, total_size, progress, auth=True):
+    """ Download url over several parallel byte range requests into a preallocated
+        part file. Finished ranges are recorded next to it so that a retry or a
+        later run only fetches the ranges that are missing
+    """
+    segments_filename = f"{part_filename}.segments"
+
+    try:
+        with open(segments_filename) as fd:
+            state = json.load(fd)
+        if state["total_size"] != total_size or not os.path.exists(part_filename):
+            raise ValueError("stale segment state")
+    except (FileNotFoundError, ValueError, KeyError):
+        state = {"total_size": total_size, "ranges": split_ranges(total_size, SEGMENTS_PER_FILE), "done": []}
+        # recorded before the part file is sized, or a full size part file left by a
+        # crash would look like a finished download to the next run
+        write_segment_state(segments_filename, state)
+        with open(part_filename, "wb") as fd:
+            preallocate(fd, 0, total_size)
+            fd.truncate(total_size)
+
+    # partially fetched segments are fetched again from their start
+    progress.reset(sum(end - start + 1 for start, end in state["done"]))
+    missing = [segment for segment in state["ranges"] if segment not in state["done"]]
+    state_lock = threading.Lock()
+
+    def fetch(start, end):
+        download_segment(url, part_filename, start, end, progress, auth)
+        with state_lock:
+            state["done"].append([start, end])
+            write_segment_state(segments_filename, state)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(missing))) as executor:
+        futures = [executor.submit(fetch, start, end) for start, end in missing]
+        for future in futures:
+            future.result()
+
+    os.remove(segments_filename)
+
+
+def file_md5(filename, length=None, hasher=None):
+    """ MD5 of the first length bytes of a file (all of it by default), added to hasher if given
+    """
+    hasher = hasher or hashlib.md5()
+    remaining = os.path.getsize(filename) if length is None else length
+    with open(filename, "rb") as fd:
+        while remaining > 0:
+            block = fd.read(min(remaining, 1024 * 1024))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def fetch_recording(download_url, part_filename, progress):
+    """ Download into part_filename, continuing from whatever an earlier attempt left
+        there, and return the MD5 hex digest of the whole file
+    """
+    # the segment state is written before the part file is sized, so a part file
+    # without one was written front to back and can be continued from its end
+    segmented_resume = os.path.exists(f"{part_filename}.segments")
+    offset = 0
+    if not segmented_resume and os.path.exists(part_filename):
+        offset = os.path.getsize(part_filename)
+
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    response = ZOOM.request("GET", download_url, "download", headers=headers, stream=True)
+
+    if response.status_code == 416 and content_range_total(response) == offset:
+        # the part file already holds the whole recording
+        response.close()
+        return file_md5(part_filename).hexdigest()
+
+    response.raise_for_status()
+
+    if response.status_code == 206:
+        total_size = content_range_total(response) or 0
+    else:
+        # the server ignored the range, start over
+        offset = 0
+        total_size = int(response.headers.get("content-length", 0))
+
+    # total size in bytes, added to the shared progress bar once per file
+    progress.set_total(total_size)
+
+    # large files from servers that accept ranges are fetched over several connections
+    segmented = (
+        SEGMENTS_PER_FILE > 1
+        and response.status_code == 200
+        and total_size > SEGMENT_THRESHOLD
+        and response.headers.get("accept-ranges", "").lower() == "bytes"
+    )
+
+    if segmented or segmented_resume:
+        # reuse the final url so the segments skip the redirect to the CDN, a signed
+        # CDN url needs no access token
+        response.close()
+        download_segmented(response.url, part_filename, total_size, progress, auth=not response.history)
+        # segments arrive out of order, so only these files are read back to hash them
+        return file_md5(part_filename).hexdigest()
+
+    progress.reset(offset)
+    # a resumed download only reads back the part that is already on disk
+    md5 = file_md5(part_filename, offset) if offset else hashlib.md5()
+    bandwidth = DOWNLOAD_BANDWIDTH.stream()
+    with open(part_filename, "ab" if offset else "wb") as fd:
+        if total_size:
+            preallocate(fd, offset, total_size - offset)
+        sync = FileSync(fd)
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            if SHUTDOWN_REQUESTED.is_set():
+                raise InterruptedError("shutdown requested")
+            bandwidth.throttle(len(chunk))
+            METRICS.inc("download_bytes_total", len(chunk))
+            progress.update(len(chunk))
+            md5.update(chunk)
+            fd.write(chunk)  # write video chunk to disk
+            sync.wrote(len(chunk))
+        sync.finish()
+
+    if total_size and os.path.getsize(part_filename) != total_size:
+        raise Exception(f"connection closed after {os.path.getsize(part_filename)} of {total_size} bytes")
+    return md5.hexdigest()
+
+
+def download_recording(download_url, email, filename, folder_name, prog_bar, file_size=0):
+    """ Download a recording file, returns its MD5 hex digest or False if it failed
+    """
+    with METRICS.timer("download_seconds"):
+        checksum = download_with_retries(download_url, email, filename, folder_name, prog_bar, file_size)
+    METRICS.inc("downloads_total", result="ok" if checksum else "failed")
+    return checksum
+
+
+def download_with_retries(download_url, email, filename, folder_name, prog_bar, file_size):
+    """ Fetch a recording file into the download directory, resuming after failures
+    """
+    dl_dir = os.sep.join([DOWNLOAD_DIRECTORY, folder_name])
+    sanitized_download_dir = path_validate.sanitize_filepath(dl_dir)
+    sanitized_filename = path_validate.sanitize_filename(filename)
+    full_filename = os.sep.join([sanitized_download_dir, sanitized_filename])
+    part_filename = f"{full_filename}.part"
+
+    with DOWNLOAD_DIR_LOCK:
+        os.makedirs(sanitized_download_dir, exist_ok=True)
+        # claim the folder so an upload worker does not remove it as empty
+        open(part_filename, "ab").close()
+
+    progress = FileProgress(prog_bar)
+    for attempt in range(DOWNLOAD_MAX_RETRIES + 1):
+        try:
+            checksum = fetch_recording(download_url, part_filename, progress)
+            if file_size and os.path.getsize(part_filename) != file_size:
+                # resuming cannot repair a file of the wrong size, start over
+                size_on_disk = os.path.getsize(part_filename)
+                os.remove(part_filename)
+                open(part_filename, "ab").close()
+                progress.reset(0)
+                raise Exception(f"downloaded {size_on_disk} bytes but Zoom listed {file_size}")
+            os.replace(part_filename, full_filename)
+            sync_directory(sanitized_download_dir)
+            progress.flush()
+            return checksum
+
+        except InterruptedError:
+            return False
+
+        except Exception as e:
+            progress.flush()
+            if attempt < DOWNLOAD_MAX_RETRIES and not SHUTDOWN_REQUESTED.is_set():
+                delay = DOWNLOAD_RETRY_DELAY * 2 ** attempt
+                METRICS.inc("download_retries_total")
+                log(
+                    f"{Color.YELLOW}### Download of '{filename}' interrupted ({e}), "
+                    f"resuming in {delay} seconds...{Color.END}"
+                )
+                time.sleep(delay)
+                continue
+
+            log(
+                f"{Color.RED}### The video recording with filename '{filename}' for user with email "
+                f"'{email}' could not be downloaded because {Color.END}'{e}'"
+            )
+
+    return False
+
+
+class InterruptibleStream:
+    """ Readable wrapper around a response body that stops once shutdown is requested
+        and keeps to the download bandwidth caps
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bandwidth = DOWNLOAD_BANDWIDTH.stream()
+
+    def read(self, size):
+        if SHUTDOWN_REQUESTED.is_set():
+            raise InterruptedError("shutdown requested")
+        data = self.raw.read(size)
+        self.bandwidth.throttle(len(data))
+        METRICS.inc("download_bytes_total", len(data))
+        return data
+
+
+def stream_recording(download_url, storage, folder_name, filename, prog_bar):
+    """ Send a recording from Zoom straight to the storage backend without writing it to disk
+    """
+    response = ZOOM.request("GET", download_url, "download", stream=True)
+    # every response opened for the upload, closed once it is over so none keeps a pooled connection
+    responses = [response]
+    unused_responses = [response]
+
+    def open_stream(offset):
+        if offset == 0 and unused_responses:
+            current = unused_responses.pop()
+        else:
+            unused_responses.clear()
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            current = ZOOM.request("GET", download_url, "download", headers=headers, stream=True)
+            responses.append(current)
+            current.raise_for_status()
+            if offset and current.status_code != 206:
+                raise Exception("the server does not support resuming this recording")
+
+        current.raw.decode_content = True
+        return InterruptibleStream(current.raw)
+
+    progress = FileProgress(prog_bar)
+    try:
+        response.raise_for_status()
+        total_size = int(response.headers.get("content-length", 0))
+        progress.set_total(total_size)
+        return storage.upload_stream(open_stream, total_size, folder_name, filename, progress.reset)
+    finally:
+        for opened in responses:
+            opened.close()
+        progress.flush()
+
+
+def remove_local_file(full_filename):
+    """ Remove an uploaded file, and its folder once nothing else is left in it
+    """
+    with DOWNLOAD_DIR_LOCK:
+        if os.path.exists(full_filename):
+            os.remove(full_filename)
+        folder = os.path.dirname(full_filename)
+        if not os.listdir(folder):
+            os.rmdir(folder)
+
+
+def file_matches(stored_file, file_size, stored):
+    """ Whether a file found in the storage backend is the listed recording file, by size
+        and, when an earlier run recorded it, by MD5
+    """
+    if not file_size or int(stored_file.get("size") or -1) != file_size:
+        return False
+    return not (stored and stored["checksum"]) or stored["checksum"] == stored_file.get("md5Checksum")
+
+
+class DownloadPool:
+    """ Downloads recording files on a pool of worker threads and logs a recording
+        as completed only once every one of its files has finished. With a storage
+        backend, such as Google Drive or S3, downloaded files are handed through a
+        bounded queue to upload workers, so downloads keep running while earlier
+        files are being uploaded.
+
+        Unless the schedule is "listing", submitted files are collected into a
+        manifest and only handed to the workers, ordered by size, by dispatch().
+        A download only starts once its size fits in the disk budget and the free
+        disk space
+    """
+
+    def __init__(self, max_workers, storage=None, schedule="listing"):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.storage = storage
+        self.schedule = schedule
+        self.manifest = []  # (recording, email, download) waiting for dispatch()
+        self.lock = threading.Lock()
+        self.pending = {}  # meeting uuid -> number of files not yet finished
+        self.failed = set()  # meeting uuids with at least one failed file
+        self.meeting_users = {}  # meeting uuid -> id of the user it belongs to
+        self.failed_users = set()  # users with at least one failed recording
+        self.failed_meetings = set()  # meeting uuids that finished with a failed file
+        self.idle = threading.Condition(self.lock)
+        self.planned_files = 0
+        self.finished_files = 0
+        self.remaining_bytes = 0  # listed size of the files not finished yet
+        self.started_at = None  # when the first file was picked up by a worker
+
+        # bytes of this run's files in the download directory, and of those still downloading
+        self.disk_space = threading.Condition()
+        self.staged_bytes = 0
+        self.downloading_bytes = 0
+        self.prog_bar = open_progress_bar()
+
+        # a full queue blocks the download workers, which bounds the staged files on disk
+        self.upload_queue = queue.Queue(maxsize=storage.upload_queue_size if storage else 1)
+        self.upload_threads = []
+        if storage and not storage.stream_uploads:
+            self.upload_threads = [
+                threading.Thread(target=self._upload_worker, daemon=True)
+                for _ in range(storage.max_concurrent_uploads)
+            ]
+        for thread in self.upload_threads:
+            thread.start()
+
+    def submit(self, recording, email, downloads, user_id=None):
+        """ Queue the files of a recording, returns False if it is already queued
+        """
+        with self.lock:
+            if recording["uuid"] in self.pending:
+                return False
+            self.pending[recording["uuid"]] = len(downloads)
+            self.meeting_users[recording["uuid"]] = user_id
+            self.planned_files += len(downloads)
+            self.remaining_bytes += sum(download[5] for download in downloads)
+            if self.schedule != "listing":
+                self.manifest.extend((recording, email, download) for download in downloads)
+                return True
+
+        for download in downloads:
+            self.executor.submit(self._process_file, recording, email, download)
+        return True
+
+    def dispatch(self):
+        """ Hand the files collected since the last call to the workers, in schedule order
+        """
+        with self.lock:
+            manifest, self.manifest = self.manifest, []
+        if not manifest:
+            return
+
+        manifest.sort(key=lambda job: job[2][5], reverse=self.schedule == "largest_first")
+        total_size = sum(download[5] for _, _, download in manifest)
+        log(
+            f"{Color.BOLD}==> Planned {len(manifest)} files, "
+            f"{format_size(total_size)}, "
+            f"{self.schedule.replace('_', ' ')}{Color.END}"
+        )
+        for recording, email, download in manifest:
+            self.executor.submit(self._process_file, recording, email, download)
+
+    def wait_idle(self):
+        """ Block until every queued recording has finished, leaving the workers running
+        """
+        with self.idle:
+            self.idle.wait_for(lambda: not self.pending)
+
+    def wait_outstanding(self, limit):
+        """ Block until at most limit of the queued files are still unfinished
+        """
+        with self.idle:
+            self.idle.wait_for(lambda: self.planned_files - self.finished_files <= limit)
+
+    def wait(self):
+        self.dispatch()
+        self.executor.shutdown(wait=True)
+        for _ in self.upload_threads:
+            self.upload_queue.put(None)
+        for thread in self.upload_threads:
+            thread.join()
+        self.prog_bar.close()
+
+    def _admit(self, size):
+        """ Wait until a download of size bytes fits in the disk budget and the free disk
+            space, returns False if it does not fit even with nothing else staged
+        """
+        with self.disk_space:
+            while True:
+                os.makedirs(DOWNLOAD_DIRECTORY, exist_ok=True)
+                free = shutil.disk_usage(DOWNLOAD_DIRECTORY).free - self.downloading_bytes - MIN_FREE_DISK
+                within_budget = not DISK_BUDGET or self.staged_bytes + size <= DISK_BUDGET
+                if size <= free and within_budget:
+                    break
+                if self.staged_bytes == 0 or SHUTDOWN_REQUESTED.is_set():
+                    # a file larger than the budget is allowed on its own, if the disk can hold it
+                    if size > free or SHUTDOWN_REQUESTED.is_set():
+                        return False
+                    break
+                # uploads free up space, other processes may as well
+                self.disk_space.wait(5)
+
+            self.staged_bytes += size
+            self.downloading_bytes += size
+            return True
+
+    def _downloaded(self, size):
+        with self.disk_space:
+            self.downloading_bytes -= size
+            self.disk_space.notify_all()
+
+    def _unstage(self, size):
+        with self.disk_space:
+            self.staged_bytes -= size
+            self.disk_space.notify_all()
+
+    def _process_file(self, recording, email, download):
+        file_type, file_extension, download_url, recording_type, recording_id, file_size = download
+        meeting_id = recording["uuid"]
+        success = False
+        queued = False
+        staged_size = 0
+        checksum = None
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+        try:
+            if SHUTDOWN_REQUESTED.is_set():
+                return
+
+            stored = STATE_STORE.get_file(recording_id)
+            if stored and stored["status"] == state_store.COMPLETE:
+                log(f"    > Skipping already downloaded file {recording_id}")
+                METRICS.inc("files_skipped_total", reason="completed")
+                success = True
+                return
+
+            params = {
+                "file_extension": file_extension,
+                "recording": recording,
+                "recording_id": recording_id,
+                "recording_type": recording_type
+            }
+            filename, folder_name = format_filename(params)
+            sanitized_filename = path_validate.sanitize_filename(filename)
+
+            in_storage = self.storage.find_file(folder_name, sanitized_filename) if self.storage else None
+            if in_storage and file_matches(in_storage, file_size, stored):
+                # uploaded by an earlier run whose state was lost
+                log(f"    > Skipping {sanitized_filename}, already in {self.storage.name}")
+                METRICS.inc("files_skipped_total", reason="in_storage")
+                STATE_STORE.mark_file(
+                    meeting_id, recording_id, state_store.COMPLETE, size=int(in_storage["size"]),
+                    checksum=in_storage.get("md5Checksum"), drive_file_id=in_storage["id"]
+                )
+                success = True
+                return
+
+            if self.storage and self.storage.stream_uploads:
+                log(f"    > Streaming {sanitized_filename} to {self.storage.name}")
+                drive_file_id = stream_recording(
+                    download_url, self.storage, folder_name, sanitized_filename, self.prog_bar
+                )
+                success = bool(drive_file_id)
+                if success:
+                    STATE_STORE.mark_file(
+                        meeting_id, recording_id, state_store.COMPLETE,
+                        drive_file_id=drive_file_id if isinstance(drive_file_id, str) else None
+                    )
+                return
+
+            sanitized_download_dir = path_validate.sanitize_filepath(
+                os.sep.join([DOWNLOAD_DIRECTORY, folder_name])
+            )
+            full_filename = os.sep.join([sanitized_download_dir, sanitized_filename])
+
+            if (
+                stored and stored["status"] == state_store.DOWNLOADED
+                and stored["path"] == full_filename and os.path.exists(full_filename)
+            ):
+                # downloaded by an earlier run that stopped before uploading it
+                log(f"    > Found downloaded {filename}")
+                METRICS.inc("files_skipped_total", reason="on_disk")
+                checksum = stored["checksum"]
+                success = True
+            elif file_size and os.path.isfile(full_filename) and os.path.getsize(full_filename) == file_size:
+                # a file of the listed size is already there, from a run whose state was lost
+                log(f"    > Found {filename} with the listed size")
+                METRICS.inc("files_skipped_total", reason="on_disk")
+                success = True
+            else:
+                if not self._admit(file_size):
+                    log(
+                        f"{Color.YELLOW}### Not enough disk space for {filename} "
+                        f"({format_size(file_size)}), "
+                        f"leaving it for the next run{Color.END}"
+                    )
+                    METRICS.inc("files_deferred_total")
+                    return
+                staged_size = file_size
+
+                log(f"    > Downloading {filename}")
+                try:
+                    checksum = download_recording(
+                        download_url, email, filename, folder_name, self.prog_bar, file_size
+                    )
+                    success = bool(checksum)
+                finally:
+                    self._downloaded(file_size)
+
+            if success:
+                STATE_STORE.mark_file(
+                    meeting_id, recording_id,
+                    state_store.DOWNLOADED if self.upload_threads else state_store.COMPLETE,
+                    size=os.path.getsize(full_filename), checksum=checksum, path=full_filename
+                )
+
+            if success and self.upload_threads:
+                self.upload_queue.put(
+                    (
+                        recording, recording_id, full_filename, folder_name, sanitized_filename,
+                        file_size, staged_size, checksum
+                    )
+                )
+                queued = True
+
+        except Exception as e:
+            log(
+                f"{Color.RED}### Failed to process file {file_type} of recording "
+                f"'{recording.get('topic')}' due to error: {str(e)}{Color.END}"
+            )
+
+        finally:
+            if not queued:
+                # kept files no longer count against the budget, only staged uploads do
+                self._unstage(staged_size)
+                if not success:
+                    STATE_STORE.mark_file(meeting_id, recording_id, state_store.FAILED)
+                self._file_finished(meeting_id, success, file_size)
+
+    def _upload_worker(self):
+        while True:
+            job = self.upload_queue.get()
+            if job is None:
+                return
+
+            recording, recording_id, full_filename, folder_name, filename, file_size, staged_size, checksum = job
+            success = False
+
+            try:
+                if SHUTDOWN_REQUESTED.is_set():
+                    continue
+
+                log(f"    > Uploading {filename} to {self.storage.name}...")
+                drive_file_id = self.storage.upload_file(full_filename, folder_name, filename, md5=checksum)
+                success = bool(drive_file_id)
+                if success:
+                    STATE_STORE.mark_file(
+                        recording["uuid"], recording_id, state_store.COMPLETE,
+                        drive_file_id=drive_file_id if isinstance(drive_file_id, str) else None
+                    )
+                    remove_local_file(full_filename)
+
+            except Exception as e:
+                log(
+                    f"{Color.RED}### Failed to upload {filename} due to error: {str(e)}{Color.END}"
+                )
+
+            finally:
+                self._unstage(staged_size)
+                self._file_finished(recording["uuid"], success, file_size)
+
+    def _report_progress(self):
+        """ Print how many files are left and when they should be done, at the measured throughput
+        """
+        elapsed = time.monotonic() - self.started_at
+        rate = METRICS.value("download_bytes_total") / elapsed if elapsed else 0
+        eta = format_interval(self.remaining_bytes / rate) if rate else "unknown"
+        log(
+            f"==> {self.finished_files} of {self.planned_files} files finished, "
+            f"{format_size(self.remaining_bytes)} left, "
+            f"{format_size(rate, 'B/s')}, ETA {eta}"
+        )
+
+    def _file_finished(self, meeting_id, success, file_size=0):
+        METRICS.inc("files_total", result="ok" if success else "failed")
+        with self.lock:
+            self.finished_files += 1
+            self.remaining_bytes -= file_size
+            self._report_progress()
+            self.idle.notify_all()
+
+            if not success:
+                self.failed.add(meeting_id)
+
+            self.pending[meeting_id] -= 1
+            if self.pending[meeting_id] > 0:
+                return
+
+            del self.pending[meeting_id]
+            user_id = self.meeting_users.pop(meeting_id)
+            if meeting_id in self.failed:
+                self.failed.discard(meeting_id)
+                self.failed_meetings.add(meeting_id)
+                self.failed_users.add(user_id)
+                STATE_STORE.mark_meeting(meeting_id, state_store.FAILED, user_id)
+                return
+
+        STATE_STORE.mark_meeting(meeting_id, state_store.COMPLETE, user_id)
+
+
+class DryRunPlan:
+    """ Takes the place of the DownloadPool in a dry run, counting the files that would
+        be downloaded instead of downloading them
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.failed_users = set()
+
+    def submit(self, recording, email, downloads, user_id=None):
+        for file_type, _, _, recording_type, recording_id, file_size in downloads:
+            stored = STATE_STORE.get_file(recording_id)
+            if stored and stored["status"] == state_store.COMPLETE:
+                continue
+            log(f"    > Would download {file_type} {recording_type} {recording_id} ({format_size(file_size)})")
+            self.files += 1
+            self.bytes += file_size
+        return True
+
+
+def meeting_complete(recording, user_id=None):
+    """ Whether a recording was downloaded by an earlier run, or by an earlier version
+        that logged the ID of its last file
+    """
+    if STATE_STORE.is_meeting_complete(recording["uuid"]):
+        return True
+
+    recording_files = recording.get("recording_files") or []
+    if recording_files and STATE_STORE.is_legacy_complete(recording_files[-1].get("id")):
+        STATE_STORE.mark_meeting(recording["uuid"], state_store.COMPLETE, user_id)
+        return True
+    return False
+
+
+def open_state_store():
+    """ Open the state database, importing the completed log and sync state file of
+        earlier versions the first time
+    """
+    global STATE_STORE
+    STATE_STORE = StateStore(STATE_DB)
+
+    imported = STATE_STORE.import_completed_log(COMPLETED_MEETING_IDS_LOG)
+    if imported:
+        print(f"{Color.DARK_CYAN}Imported {imported} completed recordings from {COMPLETED_MEETING_IDS_LOG}{Color.END}")
+
+    imported = STATE_STORE.import_sync_state(SYNC_STATE_FILE)
+    if imported:
+        print(f"{Color.DARK_CYAN}Imported the sync state of {imported} users from {SYNC_STATE_FILE}{Color.END}")
+
+
+def sync_start_date(sync_state, user_id):
+    """ Where listing starts for a user, the synced through timestamp minus the overlap
+        in incremental mode, catching recordings that were still processing last time
+    """
+    if not RECORDING_INCREMENTAL or RECORDING_FULL_RESCAN or user_id not in sync_state:
+        return RECORDING_START_DATE
+
+    synced_through = parser.parse(sync_state[user_id])
+    return max(RECORDING_START_DATE, synced_through - RECORDING_INCREMENTAL_OVERLAP)
+
+
+def select_downloads(recording, email, user_id, downloads):
+    """ The files of a recording that the Selection rules keep, counting the skipped ones
+    """
+    kept, skipped = SELECTION.select(recording, downloads, users=(email, user_id))
+    if skipped:
+        skipped_bytes = sum(download[5] for download in skipped)
+        METRICS.inc("files_skipped_total", len(skipped), reason="rules")
+        METRICS.inc("rule_skipped_bytes_total", skipped_bytes)
+        log(
+            f"==> Rules skip {len(skipped)} of {len(downloads)} files ({format_size(skipped_bytes)}) "
+            f"of {recording.get('topic')}"
+        )
+        if DRY_RUN:
+            for file_type, _, _, recording_type, recording_id, file_size in skipped:
+                log(f"    > Would skip {file_type} {recording_type} {recording_id} ({format_size(file_size)})")
+    return kept
+
+
+def queue_user_recordings(pool, sync_state, end_date=None, users=None, claim=None):
+    """ List the recordings of every user (or of users, a list of get_users() entries) and
+        queue the ones not downloaded yet, returns the ids of the users whose recordings were
+        all listed and queued. In sharded runs only the users or recordings for which
+        claim(key, job) is true are queued
+    """
+    listed_users = []
+
+    if users is None:
+        print(f"{Color.BOLD}Getting user accounts...{Color.END}")
+        users = get_users()
+
+    # users, windows and recordings are fetched lazily, so downloads start with the first window
+    for user in users:
+        email, user_id, first_name, last_name = user
+        if claim and SHARD_UNIT == "user" and not claim(user_id, user):
+            continue
+
+        userInfo = (
+            f"{first_name} {last_name} - {email}" if first_name and last_name else f"{email}"
+        )
+        log(f"\n{Color.BOLD}Getting recording list for {userInfo}{Color.END}")
+
+        start_date = sync_start_date(sync_state, user_id)
+        if start_date > RECORDING_START_DATE:
+            log(f"==> Listing recordings since {start_date:%Y-%m-%d %H:%M} UTC")
+
+        user_complete = True
+        total_count = 0
+        for index, recording in enumerate(list_recordings(user_id, start_date, end_date)):
+            total_count += 1
+            try:
+                if meeting_complete(recording, user_id):
+                    log(
+                        f"==> Skipping already downloaded recording {index + 1}: {recording.get('topic')}"
+                    )
+                    continue
+
+                downloads = get_downloads(recording)
+
+            except Exception as e:
+                log(
+                    f"{Color.RED}### Failed to get download URLs for recording {index + 1} "
+                    f"due to error: {str(e)}{Color.END}"
+                )
+                user_complete = False
+                continue
+
+            downloads = select_downloads(recording, email, user_id, downloads)
+            if not downloads:
+                continue
+
+            if claim and SHARD_UNIT == "recording" and not claim(recording["uuid"], (recording, email, downloads, user_id)):
+                continue
+
+            if pool.submit(recording, email, downloads, user_id):
+                log(f"==> Queueing recording {index + 1}: {recording.get('topic')}")
+
+        log(f"==> Found {total_count} recordings for {userInfo}")
+        if user_complete:
+            listed_users.append(user_id)
+
+    return listed_users
+
+
+def advance_sync_state(pool, sync_state, listed_users, end_date):
+    """ Move the high-water mark of every user whose recordings all made it up to end_date
+    """
+    for user_id in listed_users:
+        if user_id in pool.failed_users or user_id in INCOMPLETE_LISTINGS:
+            continue
+        previous = sync_state.get(user_id)
+        if not previous or parser.parse(previous) < end_date:
+            STATE_STORE.set_synced_through(user_id, end_date.isoformat())
+
+
+def open_shard():
+    """ This node's share of a sharded run, or None when the run is not sharded
+    """
+    if SHARD_UNIT not in ("user", "recording"):
+        raise SyncError(f"Unknown Sharding unit '{SHARD_UNIT}', use 'user' or 'recording'")
+    if "{recording_id}" not in MEETING_FILENAME:
+        # only the recording id tells apart files of the same meeting time, topic and type
+        print(f"{Color.YELLOW}### Shards may write to the same path without {{recording_id}} in the filename{Color.END}")
+
+    try:
+        if SHARD_MODE == "hash":
+            print(f"{Color.BOLD}Working on shard {SHARD_INDEX} of 0-{SHARD_COUNT - 1} by {SHARD_UNIT}{Color.END}")
+            return HashShard(SHARD_INDEX, SHARD_COUNT)
+        if SHARD_MODE == "lease":
+            if not SHARD_RUN_ID:
+                # jobs are done once per run_id, a run reusing an earlier one would download nothing
+                raise SyncError("Lease sharding needs a Sharding run_id (or --run-id) that all nodes of the run share")
+            print(f"{Color.BOLD}Leasing work by {SHARD_UNIT} from {SHARD_LEASE_DB} as {SHARD_NODE_ID}{Color.END}")
+            return LeaseStore(
+                SHARD_LEASE_DB, SHARD_RUN_ID, SHARD_NODE_ID, SHARD_LEASE_SECONDS,
+                log=lambda message: log(f"{Color.YELLOW}{message}{Color.END}")
+            )
+    except SyncError:
+        raise
+    except Exception as e:
+        raise SyncError(f"Could not set up the shard: {e}")
+
+    raise SyncError(f"Unknown Sharding mode '{SHARD_MODE}', use 'hash' or 'lease'")
+
+
+def finish_claims(pool, claimed, listed_users):
+    """ Mark the claimed jobs done, or release the failed ones for another attempt
+    """
+    for key in claimed:
+        if SHARD_UNIT == "user":
+            success = key in listed_users and key not in pool.failed_users and key not in INCOMPLETE_LISTINGS
+        else:
+            success = key not in pool.failed_meetings
+        SHARD.finish(key, success)
+    claimed.clear()
+
+
+def queue_sharded_recordings(pool, sync_state):
+    """ Download this node's share of the run. With leases, keep going until every job of
+        the run is done by some node, taking over the jobs of nodes whose leases expired
+    """
+    claimed = {}  # key -> job, claimed since the last finish_claims()
+    skipped = {}  # key -> job, held by other nodes when this node got to it
+    leasing = isinstance(SHARD, LeaseStore)
+
+    def claim(key, job):
+        if leasing and pool.planned_files - pool.finished_files > SHARD_LEASE_AHEAD:
+            # lease no more than the workers will get to soon, the rest is left to other nodes
+            pool.dispatch()
+            pool.wait_outstanding(SHARD_LEASE_AHEAD)
+        if SHARD.claim(key):
+            claimed[key] = job
+            return True
+        skipped[key] = job
+        return False
+
+    SHARD.start()
+    try:
+        listed_users = queue_user_recordings(pool, sync_state, claim=claim)
+        while True:
+            pool.dispatch()
+            pool.wait_idle()
+            finish_claims(pool, claimed, listed_users)
+
+            waiting = SHARD.unfinished(list(skipped))
+            if not waiting or SHUTDOWN_REQUESTED.is_set():
+                return listed_users
+            log(f"==> Waiting for {len(waiting)} jobs leased by other nodes")
+            if SHUTDOWN_REQUESTED.wait(SHARD_LEASE_SECONDS / 4):
+                return listed_users
+
+            retry = {key: skipped[key] for key in waiting}
+            skipped.clear()
+            if SHARD_UNIT == "user":
+                listed_users += queue_user_recordings(pool, sync_state, users=list(retry.values()), claim=claim)
+                continue
+            for key, (recording, email, downloads, user_id) in retry.items():
+                if claim(key, (recording, email, downloads, user_id)):
+                    pool.submit(recording, email, downloads, user_id)
+    finally:
+        SHARD.stop()
+
+
+def queue_webhook_recording(pool, event, payload):
+    """ Queue the files of a recording.completed webhook event
+    """
+    if event != "recording.completed":
+        return
+
+    recording = payload["object"]
+    user_id = recording.get("host_id")
+    email = recording.get("host_email", user_id)
+    if not recording.get("recording_files"):
+        # nothing to download is not a failure, Zoom would only send the event again
+        log(f"==> Skipping recording without files from webhook: {recording.get('topic')}")
+        return
+    if meeting_complete(recording, user_id):
+        log(f"==> Skipping already downloaded recording: {recording.get('topic')}")
+        return
+
+    downloads = select_downloads(recording, email, user_id, get_downloads(recording))
+    if downloads and pool.submit(recording, email, downloads, user_id):
+        log(f"==> Queueing recording from webhook: {recording.get('topic')}")
+        pool.dispatch()
+
+
+def reconcile(pool):
+    """ List every user up to now and queue the recordings that no webhook announced,
+        then move the sync state forward once they have finished
+    """
+    end_date = datetime.now(timezone.utc)
+    sync_state = STATE_STORE.sync_state() if RECORDING_INCREMENTAL else {}
+    with pool.lock:
+        pool.failed_users.clear()
+    with INCOMPLETE_LISTINGS_LOCK:
+        INCOMPLETE_LISTINGS.clear()
+
+    listed_users = queue_user_recordings(pool, sync_state, end_date)
+    pool.dispatch()
+    pool.wait_idle()
+
+    if RECORDING_INCREMENTAL:
+        advance_sync_state(pool, sync_state, listed_users, end_date)
+
+
+def serve(pool):
+    """ Run until interrupted, downloading recordings as webhooks arrive and sweeping
+        through every user each WEBHOOK_RECONCILE_INTERVAL to catch missed events
+    """
+    if not WEBHOOK_SECRET_TOKEN:
+        raise SyncError("Server mode needs the Webhook secret_token of your Zoom app")
+
+    server = WebhookServer(
+        WEBHOOK_SECRET_TOKEN,
+        lambda event, payload: queue_webhook_recording(pool, event, payload),
+        host=WEBHOOK_HOST,
+        port=WEBHOOK_PORT,
+        path=WEBHOOK_PATH,
+        max_skew=WEBHOOK_MAX_SKEW,
+        log=lambda message: log(f"{Color.RED}{message}{Color.END}")
+    )
+    server.start()
+    log(
+        f"{Color.BOLD}Listening for Zoom webhooks on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}{Color.END}"
+    )
+
+    try:
+        while not SHUTDOWN_REQUESTED.is_set():
+            if WEBHOOK_RECONCILE_INTERVAL > 0:
+                reconcile(pool)
+                write_metrics()
+                log(
+                    f"{Color.BOLD}Reconciliation sweep finished, next one in "
+                    f"{WEBHOOK_RECONCILE_INTERVAL / 60:g} minutes{Color.END}"
+                )
+            if SHUTDOWN_REQUESTED.wait(WEBHOOK_RECONCILE_INTERVAL if WEBHOOK_RECONCILE_INTERVAL > 0 else None):
+                break
+    finally:
+        server.shutdown()
+
+
+def write_metrics():
+    """ Write the JSON run report and the Prometheus text file, where configured
+    """
+    try:
+        if METRICS_REPORT_FILE:
+            METRICS.write_report(METRICS_REPORT_FILE)
+        if METRICS_TEXTFILE:
+            METRICS.write_textfile(METRICS_TEXTFILE)
+    except OSError as e:
+        print(f"{Color.RED}### Could not write the metrics: {e}{Color.END}")
+
+
+def handle_graceful_shutdown(signal_received, frame):
+    print(f"\n{Color.DARK_CYAN}SIGINT or CTRL-C detected. system.exiting gracefully.{Color.END}")
+    SHUTDOWN_REQUESTED.set()
+    write_metrics()
+
+    system.exit(0)
+
+
+def dry_run():
+    """ List the recordings and apply the Selection rules without downloading or
+        uploading anything, and return the run report with what would be downloaded
+    """
+    load_access_token()
+    open_state_store()
+    sync_state = STATE_STORE.sync_state() if RECORDING_INCREMENTAL else {}
+
+    plan = DryRunPlan()
+    queue_user_recordings(plan, sync_state)
+    TOKEN_MANAGER.stop()
+
+    skipped_files = METRICS.value("files_skipped_total", reason="rules")
+    skipped_bytes = METRICS.value("rule_skipped_bytes_total")
+    print(
+        f"\n{Color.BOLD}Dry run: would download {plan.files} files ({format_size(plan.bytes)}), "
+        f"the Selection rules skip {skipped_files} files ({format_size(skipped_bytes)}){Color.END}"
+    )
+    write_metrics()
+    report = METRICS.report()
+    report["dry_run"] = {
+        "files": plan.files, "bytes": plan.bytes, "skipped_files": skipped_files, "skipped_bytes": skipped_bytes
+    }
+    return report
+
+
+def run(serve_webhooks=False):
+    """ Download the recordings with the settings of the last configure() call, and
+        return the run report. With serve_webhooks, keep downloading the recordings
+        that Zoom webhooks announce until interrupted
+    """
+    if METRICS_PORT:
+        try:
+            METRICS.serve(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            raise SyncError(f"Could not serve metrics on {METRICS_HOST}:{METRICS_PORT}: {e}")
+
+    if DRY_RUN:
+        if serve_webhooks:
+            raise SyncError("A dry run cannot serve webhooks")
+        return dry_run()
+
+    storage = STORAGE_BACKENDS[STORAGE_METHOD or "local"]()
+
+    load_access_token()
+    open_state_store()
+    sync_state = STATE_STORE.sync_state() if RECORDING_INCREMENTAL else {}
+
+    pool = DownloadPool(MAX_CONCURRENT_DOWNLOADS, storage, DOWNLOAD_SCHEDULE)
+
+    if serve_webhooks:
+        serve(pool)
+        return METRICS.report()
+
+    if SHARD_MODE:
+        global SHARD
+        SHARD = open_shard()
+        listed_users = queue_sharded_recordings(pool, sync_state)
+    else:
+        listed_users = queue_user_recordings(pool, sync_state)
+    pool.dispatch()
+    pool.wait()
+    TOKEN_MANAGER.stop()
+
+    if RECORDING_INCREMENTAL:
+        advance_sync_state(pool, sync_state, listed_users, RECORDING_END_DATE)
+
+    api_calls = {category: count for category, count in ZOOM.calls.items() if category != "download"}
+    calls = ", ".join(f"{category}: {count}" for category, count in sorted(api_calls.items()))
+    print(f"\n{Color.BOLD}Made {sum(api_calls.values())} Zoom API calls ({calls}){Color.END}")
+
+    report = METRICS.report()
+    downloaded = report["throughput"]["download"]
+    print(
+        f"{Color.BOLD}Downloaded {format_size(downloaded['bytes'])} in "
+        f"{format_interval(report['duration_seconds'])} "
+        f"({format_size(downloaded['bytes_per_second'], 'B/s')}){Color.END}"
+    )
+    skipped_files = METRICS.value("files_skipped_total", reason="rules")
+    if skipped_files:
+        print(
+            f"{Color.BOLD}The Selection rules skipped {skipped_files} files "
+            f"({format_size(METRICS.value('rule_skipped_bytes_total'))}){Color.END}"
+        )
+    write_metrics()
+    report["failed_meetings"] = sorted(pool.failed_meetings)
+    return report
+
+
+def close():
+    """ Stop the background threads of a run and release its connections and state
+        database, so that the next one starts afresh
+    """
+    SHUTDOWN_REQUESTED.set()
+    TOKEN_MANAGER.stop()
+    LISTING_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    ZOOM.close()
+    if STATE_STORE is not None:
+        STATE_STORE.close()
+    if METRICS.httpd:
+        METRICS.httpd.shutdown()
+        METRICS.httpd.server_close()
+
+
+# runs share the module settings, so sync() calls from several threads take turns
+SYNC_LOCK = threading.Lock()
+
+
+def sync(config=CONF_PATH):
+    """ Download the recordings in this process, without prompts, and return the run report
+
+        config is a dict in the layout of the configuration file, or the path of one.
+        Recordings are stored locally unless it names another Storage method. The
+        report is the JSON run report of the Metrics section, with the uuids of the
+        recordings that failed under 'failed_meetings'. Raises SyncError when the run
+        cannot start
+    """
+    conf = config if isinstance(config, dict) else load_config(config)
+    with SYNC_LOCK:
+        configure(conf)
+        try:
+            return run()
+        finally:
+            close()
+
+
+# ################################################################
+# #                        MAIN                                  #
+# ################################################################
+
+def show_logo():
+    # clear the screen buffer
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+    # show the logo
+    print(f"""
+        {Color.DARK_CYAN}
+
+
+                             ,*****************.
+                          *************************
+                        *****************************
+                      *********************************
+                     ******               ******* ******
+                    *******                .**    ******
+                    *******                       ******/
+                    *******                       /******
+                    ///////                 //    //////
+                    ///////*              ./////.//////
+                     ////////////////////////////////*
+                       /////////////////////////////
+                          /////////////////////////
+                             ,/////////////////
+
+                        Zoom Recording Downloader
+
+                        V{APP_VERSION}
+
+        {Color.END}
+    """)
+
+
+def choose_storage_method():
+    """ Ask where to store the recordings, unless the configuration or --storage says
+    """
+    global STORAGE_METHOD, INTERACTIVE
+    if STORAGE_METHOD:
+        return
+    if not system.stdin.isatty():
+        # nobody is there to answer, e.g. in a container or cron job
+        print(f"{Color.YELLOW}### No Storage method configured, using local storage{Color.END}")
+        STORAGE_METHOD = "local"
+        return
+
+    # Storage choice prompt
+    print("\nChoose download method:")
+    print("1. Local Storage")
+    print("2. Google Drive")
+    print("3. S3")
+    choice = input("Enter choice (1-3): ")
+    STORAGE_METHOD = {"2": "google_drive", "3": "s3"}.get(choice, "local")
+    INTERACTIVE = True
+
+
+def shard_argument(value):
+    index, _, count = value.partition("/")
+    if not (index.isdigit() and count.isdigit()):
+        raise argparse.ArgumentTypeError(f"expected INDEX/COUNT, e.g. 0/3, not '{value}'")
+    return int(index), int(count)
+
+
+def parse_args(argv=None):
+    arguments = argparse.ArgumentParser(
+        description="Download the cloud recordings of a Zoom account to local storage, Google Drive or S3."
+    )
+    arguments.add_argument("--config", default=CONF_PATH, help=f"configuration file (default is {CONF_PATH})")
+    arguments.add_argument("--storage", choices=list(STORAGE_BACKENDS),
+                           help="where to store the recordings, instead of asking")
+    arguments.add_argument("--start-date", metavar="YYYY-MM-DD", help="first day of recordings to download")
+    arguments.add_argument("--end-date", metavar="YYYY-MM-DD", help="last day of recordings to download")
+    arguments.add_argument("--download-dir", help="where the recordings are downloaded")
+    arguments.add_argument("--full-rescan", action="store_true", help="list every recording again in incremental mode")
+    arguments.add_argument("--log-mode", action="store_true",
+                           help="plain output: no screen clearing, logo, colors or progress bars")
+    arguments.add_argument("--shard", type=shard_argument, metavar="INDEX/COUNT",
+                           help="the shard of this node in a hash sharded run")
+    arguments.add_argument("--run-id", help="the run a lease sharded node works on, the same on all nodes of a run")
+    arguments.add_argument("--serve", action="store_true", help="download recordings as Zoom webhooks announce them")
+    arguments.add_argument("--dry-run", action="store_true",
+                           help="show what the Selection rules would download and skip, without downloading")
+    arguments.add_argument("--set", action="append", default=[], metavar="SECTION.KEY=VALUE",
+                           help="override a setting of the configuration file, VALUE is JSON or a plain string")
+    return arguments.parse_args(argv)
+
+
+def apply_arguments(conf, args):
+    """ Write the settings given on the command line over the configuration
+    """
+    settings = [
+        ("Storage", "method", args.storage),
+        ("Storage", "download_dir", args.download_dir),
+        ("Recordings", "start_date", args.start_date),
+        ("Recordings", "end_date", args.end_date),
+        ("Recordings", "full_rescan", args.full_rescan or None),
+        ("Logging", "log_mode", args.log_mode or None),
+        ("Selection", "dry_run", args.dry_run or None),
+        ("Sharding", "run_id", args.run_id),
+    ]
+    if args.shard:
+        settings += [("Sharding", "index", args.shard[0]), ("Sharding", "count", args.shard[1])]
+    for setting in args.set:
+        key, _, value = setting.partition("=")
+        section, _, name = key.partition(".")
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass  # a plain string
+        settings.append((section, name, value))
+
+    for section, key, value in settings:
+        if value is not None:
+            conf.setdefault(section, {})[key] = value
+
+    if args.shard:
+        # --shard is a hash sharded run, without it the shard would download the whole account
+        sharding = conf["Sharding"]
+        if sharding.get("mode") not in (None, "", "hash"):
+            raise SyncError(f"--shard splits a run by hash, but the Sharding mode is '{sharding['mode']}'")
+        sharding["mode"] = "hash"
+    return conf
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # tell Python to shutdown gracefully when SIGINT is received
+    signal.signal(signal.SIGINT, handle_graceful_shutdown)
+
+    try:
+        configure(apply_arguments(load_config(args.config), args))
+
+        if LOG_MODE:
+            print(f"Zoom Recording Downloader V{APP_VERSION}, started {datetime.now().isoformat(timespec='seconds')}")
+        elif system.stdout.isatty():
+            show_logo()
+
+        if not DRY_RUN:
+            choose_storage_method()
+        run(serve_webhooks=args.serve)
+    except SyncError as e:
+        print(f"{Color.RED}### {e}{Color.END}")
+        system.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import collections
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import Metrics
+
+
+class ZoomTransport:
+    """One pooled HTTP transport for all Zoom traffic.
+
+    Requests share keep-alive connections from a pool sized to the configured
+    concurrency, always carry connect and read timeouts, go through the shared
+    rate limiter and are retried on 429, 5xx and connection errors. Authorized
+    requests get a bearer token from the token manager when they are sent, and
+    are retried once with a fresh token if Zoom answers 401. With http2
+    enabled and httpx installed, API calls that are not streamed use HTTP/2;
+    downloads always stream over the pooled HTTP/1.1 connections. Every attempt
+    is counted in metrics by category and status, with its latency until the
+    response headers arrived.
+    """
+
+    def __init__(self, rate_limiter, pool_size=10, connect_timeout=10, read_timeout=60,
+                 http2=False, max_retries=5, stop_event=None, log=print, token_manager=None, metrics=None):
+        self.rate_limiter = rate_limiter
+        self.token_manager = token_manager
+        self.metrics = metrics or Metrics()
+        self.max_retries = max_retries
+        self.stop_event = stop_event or threading.Event()
+        self.log = log
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.http2_client = None
+        if http2:
+            try:
+                import httpx
+                self.http2_client = httpx.Client(
+                    http2=True,
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                    limits=httpx.Limits(max_connections=pool_size)
+                )
+            except ImportError:
+                log("### HTTP/2 needs the httpx[http2] package, using HTTP/1.1")
+
+        # number of requests sent, by category, retries included
+        self.calls = collections.Counter()
+        self.calls_lock = threading.Lock()
+
+    def _send(self, method, url, stream, kwargs):
+        if self.http2_client is not None and not stream:
+            params = kwargs.pop("params", None)
+            data = kwargs.pop("data", None)
+            return self.http2_client.request(method, url, params=params, content=data, **kwargs)
+        return self.session.request(method, url, stream=stream, timeout=self.timeout, **kwargs)
+
+    def _authorize(self, kwargs):
+        token = self.token_manager.get()
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), "Authorization": f"Bearer {token}"}
+        return token
+
+    def request(self, method, url, category, stream=False, auth=True, **kwargs):
+        """Send a request through the rate limiter. 429 and 5xx responses and connection
+        errors are retried with exponential backoff and jitter, or after Retry-After when
+        Zoom sends one, and a 401 is retried once after refreshing the access token.
+        The last response is returned even if it is still an error.
+        """
+        attempt = 0
+        refreshed = False
+        while True:
+            self.rate_limiter.acquire(category)
+            with self.calls_lock:
+                self.calls[category] += 1
+
+            send_kwargs = dict(kwargs)
+            token = self._authorize(send_kwargs) if auth else None
+            start = time.monotonic()
+            try:
+                response = self._send(method, url, stream, send_kwargs)
+            except Exception as e:
+                self.metrics.inc("zoom_requests_total", category=category, status="error")
+                if not self._is_retryable(e) or attempt == self.max_retries or self.stop_event.is_set():
+                    raise
+                self.metrics.inc("zoom_retries_total", category=category, reason=type(e).__name__)
+                time.sleep(self.rate_limiter.backoff(attempt))
+                attempt += 1
+                continue
+
+            self.metrics.observe("zoom_request_seconds", time.monotonic() - start, category=category)
+            self.metrics.inc("zoom_requests_total", category=category, status=response.status_code)
+            self.rate_limiter.observe(category, response)
+            if response.status_code == 401 and auth and not refreshed:
+                # the token expired or was revoked early, try once more with a new one
+                refreshed = True
+                response.close()
+                self.metrics.inc("zoom_retries_total", category=category, reason=401)
+                self.token_manager.invalidate(token)
+                continue
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt == self.max_retries or self.stop_event.is_set():
+                return response
+            self.metrics.inc("zoom_retries_total", category=category, reason=response.status_code)
+
+            delay = self.rate_limiter.retry_after(response)
+            if delay is None:
+                delay = self.rate_limiter.backoff(attempt)
+            if delay > 60:
+                self.log(f"### Zoom asked to wait {delay:.0f} seconds before retrying {category} requests")
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _is_retryable(self, error):
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        if self.http2_client is not None:
+            import httpx
+            return isinstance(error, httpx.TransportError)
+        return False
+
+    def close(self):
+        self.session.close()
+        if self.http2_client is not None:
+            self.http2_client.close()